@@ -1,4 +1,44 @@
-import random
+import random, math, itertools
+
+# For every possible 10-bit mask, the list of card indices whose bit is set. One table
+# for the lower half (cards 0-9) and one for the upper half (cards 10-19) of a card mask.
+_LOWER_INDICES = [[i for i in range(10) if mask >> i & 1] for mask in range(1024)]
+_UPPER_INDICES = [[i + 10 for i in range(10) if mask >> i & 1] for mask in range(1024)]
+
+def _indices(mask):
+	"""
+	:param mask: A 20-bit integer in which bit i is set if card i is included
+	:return: A list of the indices of all cards in the mask, in ascending order
+	"""
+	return _LOWER_INDICES[mask & 1023] + _UPPER_INDICES[mask >> 10]
+
+# For every card index, the mask of all cards of the same suit
+_SUIT_MASKS = [0b11111 << (index // 5 * 5) for index in range(20)]
+
+# For every card index, the mask of all cards of the same suit that win from it.
+# Within a suit, higher ranked cards always have lower indices.
+_HIGHER_MASKS = [_SUIT_MASKS[index] & ((1 << index) - 1) for index in range(20)]
+
+# Random 64-bit keys for Zobrist hashing. The hash of a deck is the XOR of the keys of
+# everything in it, so it can be kept up to date by XOR-ing keys in and out on every change.
+# A fixed seed makes hashes the same in every process.
+_zobrist = random.Random(66)
+
+# One key per card for every location in every view, ordered like the masks of a deck:
+# the key of card index in location i of the masks is at i * 20 + index
+_LOCATION_KEYS = [_zobrist.getrandbits(64) for location in range(18) for index in range(20)]
+
+# One key per card for every position in the stock
+_STOCK_KEYS = [[_zobrist.getrandbits(64) for index in range(20)] for position in range(20)]
+
+# One key for every size the stock can have, used when the order of the stock is not known
+_STOCK_SIZE_KEYS = [_zobrist.getrandbits(64) for size in range(21)]
+
+# One key per card for both sides of the trick
+_TRICK_KEYS = [[_zobrist.getrandbits(64) for index in range(20)] for player in range(2)]
+
+# One key for every trump suit
+_TRUMP_KEYS = {suit: _zobrist.getrandbits(64) for suit in ["C", "D", "H", "S"]}
 
 class Deck:
 	"""
@@ -8,13 +48,24 @@ class Deck:
 	__RANKS = ["A", "10", "K", "Q", "J"]
 	__SUITS = ["C", "D", "H", "S"]
 
-	# A list of length 20 representing all cards and their states
-	__card_state = None # type: list[str]
-
-	# A list of length 20 representing all KNOWN cards and
-	# their states from the perspective of each player
-	__p1_perspective = None
-	__p2_perspective = None
+	# All locations a card can be in. Only the perspectives of the players
+	# contain unknown ("U") cards, the full card state always knows where a card is.
+	# The hand of player p is at location 1 + p, the won cards of player p at 3 + p.
+	__LOCATIONS = ["U", "S", "P1H", "P2H", "P1W", "P2W"]
+	__LOCATION_INDEX = {"U": 0, "S": 1, "P1H": 2, "P2H": 3, "P1W": 4, "P2W": 5}
+
+	# The states of all cards are stored as bitmasks: for every location there is
+	# a 20-bit integer in which bit i is set if card i is in that location.
+	# There are three views on the deck, each consisting of six masks (one per location):
+	# view 0 is the full card state, views 1 and 2 are the KNOWN card states
+	# from the perspective of player 1 and player 2 respectively.
+	# All 18 masks are kept in one flat list, the mask of a location in a view
+	# is found at index view * 6 + location.
+	__masks = None # type: list[int]
+
+	# Zobrist hashes of the parts of this deck, kept up to date with every change:
+	# the card locations in each of the three views, the order of the stock and the trick.
+	__hashes = None # type: list[int]
 
 	#We use the following index representations for cards:
 
@@ -56,22 +107,23 @@ class Deck:
 				):
 		"""
 		:param card_state: list of current card states
-		:param card_state: list of current card states
-		:param card_state: list of current card states
+		:param p1_perspective: list of card states as known by player 1
+		:param p2_perspective: list of card states as known by player 2
 
 		:param stock: list of indexes of cards in stock
 		:param trump_suit: {C,D,H,S}
 		"""
 
-		self.__card_state	= card_state
-
-		self.__p1_perspective = p1_perspective
-		self.__p2_perspective = p2_perspective
+		self.__masks = Deck.__to_masks(card_state) + Deck.__to_masks(p1_perspective) + Deck.__to_masks(p2_perspective)
 
 		self.__stock		= stock
 
+		self.__trick = [None, None]
+		self.__previous_trick = [None, None]
+
 		self.__trump_suit	=  trump_suit if trump_suit is not None else self.get_suit(self.__stock[0])
 
+		self.__compute_hashes()
 
 
 	# Computes the rank of a given card index, following the ordering given above.
@@ -87,11 +139,11 @@ class Deck:
 
 	# Returns a list of all the cards' states
 	def get_card_states(self):
-		return list(self.__card_state)
+		return self.__to_states(0)
 
 	# Returns the state of the card at the specified index
 	def get_card_state(self, index):
-		return self.__card_state[index]
+		return Deck.__LOCATIONS[self.__location(0, index)]
 
 	# Returns a list of all cards currently in the stock
 	def get_stock(self):
@@ -107,7 +159,7 @@ class Deck:
 
 	# Sets the card at the specified index to the specified state
 	def set_card(self, index, state):
-		self.__card_state[index] = state
+		self.__place(index, Deck.__LOCATION_INDEX[state], (0,), 0)
 
 	# Returns a tuple containing the card indices of the cards currently part of the trick. The index of a card will be
 	# set to None if no card is put down on that side of the trick. TODO: strange wording
@@ -119,6 +171,11 @@ class Deck:
 
 	# Places card in the trick in the position of the specified player. Returns the resulting trick.
 	def set_trick(self, player, card):
+		if self.__trick[player-1] is not None:
+			self.__hashes[4] ^= _TRICK_KEYS[player-1][self.__trick[player-1]]
+		if card is not None:
+			self.__hashes[4] ^= _TRICK_KEYS[player-1][card]
+
 		self.__trick[player-1] = card
 		return self.__trick
 
@@ -127,16 +184,18 @@ class Deck:
 
 		# Depending on whether this state is signed or not, we look either through
 		# the perspective of the full card deck, or the perspective of a single player
-		perspective = self.get_perspective()
+		hand = self.get_player_hand_mask(player)
 
 		# If game is in phase 1 and player has trump jack
-		return (self.get_stock_size() > 0) and (perspective[self.get_trump_jack_index()] == "P" + str(player) + "H")
+		return (self.get_stock_size() > 0) and (hand >> self.get_trump_jack_index()) & 1 == 1
 
 	# Returns a list of the cards in the hand of the player that is specified.
 	def get_player_hand(self, player):
-		search_term = "P1H" if player == 1 else "P2H"
-		search_array = self.get_perspective()
-		return [i for i, x in enumerate(search_array) if x == search_term]
+		return _indices(self.get_player_hand_mask(player))
+
+	# Returns the hand of the player that is specified as a mask, in which bit i is set if card i is in the hand.
+	def get_player_hand_mask(self, player):
+		return self.__masks[self.__view() * 6 + 1 + player]
 
 	# Returns the suit of the trump card.
 	def get_trump_suit(self):
@@ -145,9 +204,11 @@ class Deck:
 	# Swaps places of the trump card with the trump Jack.
 	def exchange_trump(self, trump_jack_index):
 		trump_card_index = self.__stock[0]
-		self.__card_state[trump_card_index] = self.__p1_perspective[trump_card_index] = self.__p2_perspective[trump_card_index] = self.__card_state[trump_jack_index]
-		self.__card_state[trump_jack_index] = self.__p1_perspective[trump_jack_index] = self.__p2_perspective[trump_jack_index] = "S"
+		hand = self.__location(0, trump_jack_index)
+		self.__place(trump_card_index, hand, (0, 1, 2), 1)
+		self.__place(trump_jack_index, 1, (0, 1, 2), hand)
 		self.__stock[0] = trump_jack_index
+		self.__hashes[3] ^= _STOCK_KEYS[0][trump_card_index] ^ _STOCK_KEYS[0][trump_jack_index]
 
 		# This is done to help the visual part differentiate between
 		# Trump Jack Exchanges and regular moves. Shouldn't affect anything.
@@ -172,41 +233,34 @@ class Deck:
 	# Returns a list of possible marriages for the specified player.
 	def get_possible_mariages(self, player):
 		possible_mariages = []
-		player_hand = self.get_player_hand(player)
-		#TODO: quite bulky, maybe change into a more elegant solution or at the very least comment
-		if 2 in player_hand and 3 in player_hand:
-			possible_mariages.append((2, 3))
-			possible_mariages.append((3, 2))
-		if 7 in player_hand and 8 in player_hand:
-			possible_mariages.append((7, 8))
-			possible_mariages.append((8, 7))
-		if 12 in player_hand and 13 in player_hand:
-			possible_mariages.append((12, 13))
-			possible_mariages.append((13, 12))
-		if 17 in player_hand and 18 in player_hand:
-			possible_mariages.append((17, 18))
-			possible_mariages.append((18, 17))
+		player_hand = self.get_player_hand_mask(player)
+
+		# The king and queen of a suit are always the third and fourth card of that suit
+		for king in (2, 7, 12, 17):
+			if (player_hand >> king) & 3 == 3:
+				possible_mariages.append((king, king + 1))
+				possible_mariages.append((king + 1, king))
 
 		return possible_mariages
 
 	# Takes the top card of the stock and places it in the specified player's hand.
 	def draw_card(self, player):
-		if self.get_stock_size() == 0:
+		if len(self.__stock) == 0:
 			raise RuntimeError('Stack is empty.')
 		card = self.__stock.pop()
-		if player == 1:
-			self.__card_state[card] = self.__p1_perspective[card] = "P1H"
-		else:
-			self.__card_state[card] = self.__p2_perspective[card] = "P2H"
+		self.__hashes[3] ^= _STOCK_KEYS[len(self.__stock)][card]
+		self.__place(card, 1 + player, (0, player), 1)
 
 	# Puts the cards in the trick in the specified winner's pile of won cards. After this operation the trick is emptied.
 	# Player perspectives are also updated
 	def put_trick_away(self, winner):
-		self.__card_state[self.__trick[0]] = self.__card_state[self.__trick[1]] = self.__p1_perspective[self.__trick[0]] = self.__p1_perspective[self.__trick[1]] = self.__p2_perspective[self.__trick[0]] = self.__p2_perspective[self.__trick[1]] = "P1W" if winner == 1 else "P2W"
+		self.__place(self.__trick[0], 3 + winner, (0, 1, 2), 2)
+		self.__place(self.__trick[1], 3 + winner, (0, 1, 2), 3)
 
 		# Don't need to make a deep copy in this instance, tested.
 		self.__previous_trick = self.__trick;
 		self.__trick = [None, None]
+		self.__hashes[4] = 0
 
 	def add_to_perspective(self, player, index, card_state):
 		"""
@@ -217,10 +271,7 @@ class Deck:
 		:param card_state: A string signifying the state of the card
 		"""
 
-		if player == 1:
-			self.__p1_perspective[index] = card_state
-		else:
-			self.__p2_perspective[index] = card_state
+		self.__place(index, Deck.__LOCATION_INDEX[card_state], (player,), 0)
 
 	#Look into overloading this function as well
 	# Generates a new deck based on a seed. If no seed is given, a random seed in generated.
@@ -266,42 +317,83 @@ class Deck:
 		:return: A deck object with the card_state array changed
 		to represent a random guess of the states of the unknown cards.
 		"""
+		return self.make_assumptions(1, seed)[0]
+
+	def make_assumptions(self, n, seed=None, distinct=False):
+		"""
+		Makes n guesses for the states of the unknown cards at once, as make_assumption() does.
+		Everything the guesses have in common is only worked out once, and all guesses are
+		drawn from a single random number generator.
+
+		:param n: The number of guesses
+		:param seed: Optional random number generator seed. The first guess is the same as
+			that of make_assumption() with the same seed.
+		:param distinct: If True, no two guesses deal the unknown cards in the same way. Fewer
+			than n guesses are made when there are fewer possible deals.
+		:return: A list of deck objects, each representing a random guess of the states of the unknown cards.
+		"""
 		if seed is None:
 			seed = random.randint(0, 100000)
 
 		rng = random.Random(seed)
 
-		perspective = self.get_perspective()
+		base = self.__assumption_base()
+		unknowns = list(base[3])
+		in_stock = len(unknowns) - base[4]
 
-		trump_index = perspective.index("S")
+		if distinct:
+			n = min(n, self.count_deals())
+			deals = set()
 
-		unknowns = [index for index, card in enumerate(perspective) if card == "U"]
+		decks = []
+		while len(decks) < n:
+			rng.shuffle(unknowns)
 
-		rng.shuffle(unknowns)
+			if distinct:
+				# The stock order and the cards dealt to the opponent, who gets the last cards
+				deal = (tuple(unknowns[:in_stock]), frozenset(unknowns[in_stock:]))
+				if deal in deals:
+					continue
+				deals.add(deal)
 
-		other_player_term = "P2H" if self.__signature == 1 else "P1H"
+			decks.append(self.__assume(base, unknowns[:in_stock], unknowns[in_stock:]))
 
-		other_player_unknowns = 5 - perspective.count(other_player_term)
+		return decks
 
-		for i in range(other_player_unknowns):
-			perspective[unknowns.pop()] = other_player_term
+	def make_all_assumptions(self):
+		"""
+		Makes every possible guess for the states of the unknown cards: every way to deal the
+		unknown cards to the opponent's hand and to the stock, in every order. All guesses are
+		equally likely. Check count_deals() first, the number of guesses grows very quickly.
 
-		stock = [trump_index] + unknowns
+		:return: A list of deck objects, one for every possible deal
+		"""
+		base = self.__assumption_base()
+		unknowns = base[3]
 
-		for i in range(len(unknowns)):
-			perspective[unknowns.pop()] = "S"
+		decks = []
+		for hand in itertools.combinations(unknowns, base[4]):
+			rest = [card for card in unknowns if card not in hand]
 
-		deck = Deck(perspective, stock, list(self.__p1_perspective), list(self.__p2_perspective))
+			for stock in itertools.permutations(rest):
+				decks.append(self.__assume(base, stock, hand))
 
-		deck.__trick = list(self.__trick)
-		deck.__previous_trick = list(self.__previous_trick) if self.__previous_trick is not None else None
+		return decks
 
-		deck.__signature = None
+	def count_deals(self):
+		"""
+		:return: The number of different ways in which the unknown cards can be dealt to the
+			opponent's hand and the stock, as seen by the signing player
+		"""
+		base = self.__assumption_base()
+		unknowns, other_player_unknowns = len(base[3]), base[4]
 
-		return deck
+		# Choose the opponent's cards, then order the rest in the stock: u! / (k! (u - k)!) * (u - k)!
+		return math.factorial(unknowns) // math.factorial(other_player_unknowns)
 
 	def clone(self, signature):
-		deck = Deck(list(self.__card_state), list(self.__stock), list(self.__p1_perspective), list(self.__p2_perspective), self.__trump_suit)
+		deck = Deck.__from_masks(list(self.__masks), list(self.__stock), self.__trump_suit)
+		deck.__hashes = list(self.__hashes)
 
 		deck.__signature = signature if self.__signature is None else self.__signature
 		deck.__trick = list(self.__trick)
@@ -309,30 +401,242 @@ class Deck:
 
 		return deck
 
+	# Returns a record of everything a move can change in this deck, to be given to restore().
+	# The previous trick is never changed in place, so it does not need to be copied.
+	def save(self):
+		return list(self.__masks), list(self.__hashes), list(self.__stock), list(self.__trick), self.__previous_trick
+
+	# Puts this deck back in the situation it was in when save() returned the given record.
+	# The deck takes over the lists in the record, so every record can only be restored once.
+	def restore(self, saved):
+		self.__masks, self.__hashes, self.__stock, self.__trick, self.__previous_trick = saved
+
 	def get_perspective(self, player=None):
-		if self.__signature is None:
-			if player is None:
-				return self.__card_state
-			return list(self.__p1_perspective) if player == 1 else list(self.__p2_perspective)
-		return list(self.__p1_perspective) if self.__signature == 1 else list(self.__p2_perspective)
+		return self.__to_states(self.__view(player))
+
+	def get_hash(self, player=None):
+		"""
+		Returns a 64-bit Zobrist hash of this deck, which is kept up to date as the deck changes.
+
+		:param player: If given, or if the deck is signed, the hash only covers what that player
+			knows: their perspective, the trick, the face up trump card and the size of the stock.
+			Otherwise it covers the full card state, both perspectives and the order of the stock.
+		"""
+		view = self.__view(player)
+		hash_value = self.__hashes[4] ^ _TRUMP_KEYS[self.__trump_suit]
+
+		if view == 0:
+			return hash_value ^ self.__hashes[0] ^ self.__hashes[1] ^ self.__hashes[2] ^ self.__hashes[3]
+
+		hash_value ^= self.__hashes[view] ^ _STOCK_SIZE_KEYS[len(self.__stock)]
+		if len(self.__stock) > 0:
+			hash_value ^= _STOCK_KEYS[0][self.__stock[0]]
+
+		return hash_value
 
 	def get_signature(self):
 		return self.__signature
 
 	def convert_to_json(self):
-		return {"card_state":self.__card_state, "p1_perspective":self.__p1_perspective, "p2_perspective":self.__p2_perspective, "trick":self.__trick, "previous_trick":self.__previous_trick, "stock":self.__stock, "trump_suit":self.__trump_suit, "signature":self.__signature}
+		return {"card_state":self.__to_states(0), "p1_perspective":self.__to_states(1), "p2_perspective":self.__to_states(2), "trick":self.__trick, "previous_trick":self.__previous_trick, "stock":self.__stock, "trump_suit":self.__trump_suit, "signature":self.__signature}
 
 	@staticmethod
 	def load_from_json(dict):
-		deck = Deck(dict['card_state'], dict['stock'], dict['p1_perspective'], dict['p2_perspective'])
+		deck = Deck(dict['card_state'], dict['stock'], dict['p1_perspective'], dict['p2_perspective'], dict['trump_suit'])
 		deck.__signature = dict['signature']
 		deck.__trick = dict['trick']
 		deck.__previous_trick = dict['previous_trick']
 
+		deck.__compute_hashes()
+
+		return deck
+
+	def __assumption_base(self):
+		"""
+		Works out what all guesses for the unknown cards have in common.
+
+		:return: A tuple of the masks of the perspective, the trump card, the location of the opponent's
+			hand, the unknown cards, the number of unknown cards in the opponent's hand, and the hash
+			of the known cards
+		"""
+		view = self.__view()
+		perspective = self.__masks[view * 6:view * 6 + 6]
+
+		# The lowest card in the stock is the face up trump card
+		trump_index = (perspective[1] & -perspective[1]).bit_length() - 1
+
+		other_player = 2 if self.__signature == 1 else 1
+		hand = 1 + other_player
+
+		other_player_unknowns = 5 - bin(perspective[hand]).count("1")
+
+		# The hash of the full card state of every guess starts from the known cards
+		known_hash = 0
+		for i in range(1, 6):
+			for index in _indices(perspective[i]):
+				known_hash ^= _LOCATION_KEYS[i * 20 + index]
+
+		return perspective, trump_index, hand, _indices(perspective[0]), other_player_unknowns, known_hash
+
+	def __assume(self, base, stock_cards, hand_cards):
+		"""
+		:param base: The result of __assumption_base()
+		:param stock_cards: The unknown cards to put in the stock, from the top down
+		:param hand_cards: The unknown cards to put in the opponent's hand
+		:return: A perfect information deck with the unknown cards dealt as given
+		"""
+		perspective, trump_index, hand, _, _, hash_value = base
+
+		masks = list(perspective)
+		stock = [trump_index]
+
+		for card in stock_cards:
+			masks[1] |= 1 << card
+			stock.append(card)
+			hash_value ^= _LOCATION_KEYS[20 + card]
+
+		for card in hand_cards:
+			masks[hand] |= 1 << card
+			hash_value ^= _LOCATION_KEYS[hand * 20 + card]
+
+		masks[0] = 0
+
+		deck = Deck.__from_masks(masks + self.__masks[6:], stock, self.get_suit(trump_index))
+
+		deck.__trick = list(self.__trick)
+		deck.__previous_trick = list(self.__previous_trick) if self.__previous_trick is not None else None
+
+		deck.__signature = None
+
+		# Only the full card state and the stock differ from this deck
+		deck.__hashes = [hash_value, self.__hashes[1], self.__hashes[2], deck.__stock_hash(), self.__hashes[4]]
+
 		return deck
 
+	@staticmethod
+	def __from_masks(masks, stock, trump_suit):
+		"""
+		Creates a deck directly from its bitmasks, without converting from lists of card states.
+
+		:param masks: The flat list of 18 location masks
+		:param stock: list of indexes of cards in stock
+		:param trump_suit: {C,D,H,S}
+		"""
+		deck = Deck.__new__(Deck)
+		deck.__masks = masks
+		deck.__stock = stock
+		deck.__trump_suit = trump_suit
+
+		return deck
+
+	@staticmethod
+	def __to_masks(card_states):
+		"""
+		:param card_states: A list of 20 card states, or None if no card is known
+		:return: A list of six masks, one for every location
+		"""
+		if card_states is None:
+			return [(1 << 20) - 1, 0, 0, 0, 0, 0]
+
+		masks = [0] * 6
+		for index, card_state in enumerate(card_states):
+			masks[Deck.__LOCATION_INDEX[card_state]] |= 1 << index
+
+		return masks
+
+	def __to_states(self, view):
+		"""
+		:param view: 0 for the full card state, 1 or 2 for the perspective of that player
+		:return: A new list of 20 strings, containing the state of each card in the given view
+		"""
+		card_states = [None] * 20
+		for location in range(6):
+			for index in _indices(self.__masks[view * 6 + location]):
+				card_states[index] = Deck.__LOCATIONS[location]
+
+		return card_states
+
+	def __compute_hashes(self):
+		"""
+		Computes all hashes of this deck from scratch.
+		"""
+		self.__hashes = [self.__view_hash(0), self.__view_hash(1), self.__view_hash(2), self.__stock_hash(), 0]
+
+		for player in (1, 2):
+			if self.__trick[player-1] is not None:
+				self.__hashes[4] ^= _TRICK_KEYS[player-1][self.__trick[player-1]]
+
+	def __view_hash(self, view):
+		"""
+		:return: The hash of the card locations in the given view, computed from scratch
+		"""
+		hash_value = 0
+		for i in range(view * 6, view * 6 + 6):
+			for index in _indices(self.__masks[i]):
+				hash_value ^= _LOCATION_KEYS[i * 20 + index]
+
+		return hash_value
+
+	def __stock_hash(self):
+		"""
+		:return: The hash of the order of the stock, computed from scratch
+		"""
+		hash_value = 0
+		for position, index in enumerate(self.__stock):
+			hash_value ^= _STOCK_KEYS[position][index]
+
+		return hash_value
+
+	def __view(self, player=None):
+		"""
+		:param player: Optional player id, only used when the deck is not signed
+		:return: The view through which this deck is looked at: the perspective of
+			the signing player, or else that of the given player, or else the full card state.
+		"""
+		if self.__signature is not None:
+			return self.__signature
+		return 0 if player is None else player
+
+	def __location(self, view, index):
+		"""
+		:return: The location of the card at the given index in the given view
+		"""
+		for location in range(6):
+			if (self.__masks[view * 6 + location] >> index) & 1:
+				return location
+
+	def __place(self, index, location, views, current):
+		"""
+		Moves the card at the given index to the given location in each of the given views
+
+		:param index: An integer signifying the index of a card
+		:param location: The index of the location in __LOCATIONS
+		:param views: A tuple of views, 0 for the full card state, 1 or 2 for the perspective of that player
+		:param current: The location the card is most likely in now, which is checked first
+		"""
+		masks = self.__masks
+		hashes = self.__hashes
+		keys = _LOCATION_KEYS
+		bit = 1 << index
+
+		for view in views:
+			offset = view * 6
+
+			i = offset + current
+			if not masks[i] & bit:
+				i = offset
+				while not masks[i] & bit:
+					i += 1
+
+			masks[i] ^= bit
+			masks[offset + location] |= bit
+			hashes[view] ^= keys[i * 20 + index] ^ keys[(offset + location) * 20 + index]
+
 	def __eq__(self, o):
-		return self.__card_state == o.__card_state and self.__p1_perspective == o.__p1_perspective and self.__p2_perspective == o.__p2_perspective and self.__trick == o.__trick and self.__stock == o.__stock and self.__trump_suit == o.__trump_suit and self.__signature == o.__signature
+		return self.__masks == o.__masks and self.__trick == o.__trick and self.__stock == o.__stock and self.__trump_suit == o.__trump_suit and self.__signature == o.__signature
 
 	def __ne__(self, o):
-		return not (self.__card_state == o.__card_state and self.__p1_perspective == o.__p1_perspective and self.__p2_perspective == o.__p2_perspective and self.__trick == o.__trick and self.__stock == o.__stock and self.__trump_suit == o.__trump_suit and self.__signature == o.__signature)
+		return not (self.__masks == o.__masks and self.__trick == o.__trick and self.__stock == o.__stock and self.__trump_suit == o.__trump_suit and self.__signature == o.__signature)
+
+	def __hash__(self):
+		return self.get_hash()
@@ -1,7 +1,23 @@
 from api import util, Deck
+from api._deck import _indices, _SUIT_MASKS, _HIGHER_MASKS
 from json import dumps
 import random
 
+# Random 64-bit keys for the Zobrist hash of a state, next to the keys of the deck.
+# A fixed seed makes hashes the same in every process.
+_zobrist = random.Random(33)
+
+# Keys for player 1 being to move, the player to move leading the trick, and the game being in phase 2
+_TURN_KEY = _zobrist.getrandbits(64)
+_LEADS_KEY = _zobrist.getrandbits(64)
+_PHASE_KEY = _zobrist.getrandbits(64)
+
+# One key per player for every point count and every pending point count
+_POINTS_KEYS = [[_zobrist.getrandbits(64) for points in range(256)] for player in range(2)]
+_PENDING_KEYS = [[_zobrist.getrandbits(64) for points in range(256)] for player in range(2)]
+
+# One key for every player that can have revoked
+_REVOKED_KEYS = {None: 0, 1: _zobrist.getrandbits(64), 2: _zobrist.getrandbits(64)}
 
 class State:
 	__deck = None  # type: Deck
@@ -22,6 +38,9 @@ class State:
 
 	__revoked = None  # type: int, None
 
+	# Stack of saved situations, one for every move played with apply() that can still be undone
+	__history = None  # type: list[tuple]
+
 	def __init__(self,
 				 deck,
 				 player1s_turn,
@@ -60,91 +79,163 @@ class State:
 		:return: Newly computed state based on current state and given move
 		"""
 
+		self.__check_next()
+
+		# Start with a copy of the current state
+		state = self.clone()  # type: State
+
+		state.__play(move)
+
+		# Returns state
+		return state
+
+	def playout(self, depth=None, rng=random):
+		"""
+		Plays random moves from this state, until the game is finished or depth moves
+		have been played. All moves are played in place on a single copy of this state,
+		so no intermediate states are created. The moves are drawn with rng.choice(moves()),
+		so a playout draws the same moves as a loop over next() with the same generator.
+
+		:param depth: The maximum number of moves to play, None plays until the end of the game
+		:param rng: The random number generator to draw moves with, by default the global one
+		:return: The state at the end of the playout
+		"""
+		state = self.clone()
+
+		played = 0
+		while not state.finished() and (depth is None or played < depth):
+			state.__check_next()
+			state.__play(rng.choice(state.moves()), False)
+			played += 1
+
+		return state
+
+	def apply(self,
+			  move  # type: tuple(int, int)
+			  ):
+		"""
+		Plays the given move on this state itself, instead of on a copy as next() does.
+		The move can be taken back again with undo(). This lets search algorithms walk
+		up and down the game tree without creating a new state for every node.
+
+		:param move: Tuple of length 2 of which each element can either be an int or None
+		"""
+
+		self.__check_next()
+
+		saved = self.__save()
+
+		self.__play(move)
+
+		if self.__history is None:
+			self.__history = []
+		self.__history.append(saved)
+
+	def undo(self):
+		"""
+		Takes back the last move that was played on this state with apply().
+		"""
+
+		if not self.__history:
+			raise RuntimeError('No applied move to undo.')
+
+		self.__restore(self.__history.pop())
+
+	def __check_next(self):
+		"""
+		Raises an error if no move can be played from this state.
+		"""
+
 		if self.__signature is not None and self.__signature != self.whose_turn():
 			raise RuntimeError('\n\nGame is in phase 1. Cannot view next state with imperfect information. Try making an assumption first.\n')
 
 		if self.finished():
 			raise RuntimeError('Gamestate is finished. No next states exist.')
 
-		# Start with a copy of the current state
-		state = self.clone()  # type: State
+	def __play(self,
+			   move,  # type: tuple(int, int)
+			   validate=True
+			   ):
+		"""
+		Changes this state in place by playing the given move. Used by next(), apply() and playout().
+
+		:param move: Tuple of length 2 of which each element can either be an int or None
+		:param validate: Whether to check the move, which can be skipped for moves taken from moves()
+		"""
 
 		# If we find an invalid move, we set the __revoked class variable
-		# To the pid of the player who made the incorrect move, and return the state as is.
-		if not state.__is_valid(move):
-			state.__revoked = state.whose_turn()
-			return state
+		# To the pid of the player who made the incorrect move, and leave the state as is.
+		if validate and not self.__is_valid(move):
+			self.__revoked = self.whose_turn()
+			return
 
 		# If move is a trump exchange
 		if move[0] is None:
 
 			# Store the indices we need in variables
 			trump_jack_index = move[1]
-			trump_card_index = state.__deck.get_trump_card_index()
+			trump_card_index = self.__deck.get_trump_card_index()
 
 			# Perform trump jack exchange, perspective updated in function
-			state.__exchange_trump(trump_jack_index)
+			self.__exchange_trump(trump_jack_index)
 
-			return state
+			return
 
 		# Change turns
-		state.__leads_turn = not state.__leads_turn
+		self.__leads_turn = not self.__leads_turn
 
 		#Add the given move to the trick, store the whole trick in a variable
-		trick = state.__deck.set_trick(state.whose_turn(), move[0])
+		trick = self.__deck.set_trick(self.whose_turn(), move[0])
 
 		# At this point, we know that the move is not a trump jack exchange.
 		# Check if this move is a marriage
 		if move[1] is not None:
 
 			# A marriage cannot be melded by the non-leading player
-			if state.__leads_turn:
+			if self.__leads_turn:
 				raise RuntimeError("Marriage was attempted to be melded by non-leading player")
 
 			# Update perspective since an additional card is revealed by the player who performs a marriage.
-			state.__deck.add_to_perspective(util.other(state.whose_turn()), move[1], "P" + str(state.whose_turn()) + "H")
+			self.__deck.add_to_perspective(util.other(self.whose_turn()), move[1], "P" + str(self.whose_turn()) + "H")
 
 			# Trump suit marriage yields 40 points, regular yields 20, to be awarded at next trick win.
-			if Deck.get_suit(move[1]) == state.__deck.get_trump_suit():
-				state.__reserve_pending_points(state.whose_turn(), 40)
+			if Deck.get_suit(move[1]) == self.__deck.get_trump_suit():
+				self.__reserve_pending_points(self.whose_turn(), 40)
 			else:
-				state.__reserve_pending_points(state.whose_turn(), 20)
+				self.__reserve_pending_points(self.whose_turn(), 20)
 
 		# If it is not the lead's turn, i.e. currently the trick is
 		# incomplete and we already know it's not a trump jack exchange
-		if not state.__leads_turn:
-			other = state.whose_turn()
-			state.__player1s_turn = not state.__player1s_turn
-			state.__deck.add_to_perspective(state.whose_turn(), trick[other-1], "P" + str(other) + "H")
-			return state
+		if not self.__leads_turn:
+			other = self.whose_turn()
+			self.__player1s_turn = not self.__player1s_turn
+			self.__deck.add_to_perspective(self.whose_turn(), trick[other-1], "P" + str(other) + "H")
+			return
 
 		# At this point we know that it is the lead's turn and that a complete
 		# trick from the previous hand can be evaluated.
 
 		# Evaluate the trick and store the winner in the leader variable
-		leader = state.__evaluate_trick(trick)
+		leader = self.__evaluate_trick(trick)
 
-		state.__allocate_trick_points(leader, trick)
+		self.__allocate_trick_points(leader, trick)
 
-		state.__deck.put_trick_away(leader)
+		self.__deck.put_trick_away(leader)
 
-		if state.__phase == 2 and len(state.hand()) == 0 and not state.finished():
+		if self.__phase == 2 and self.__deck.get_player_hand_mask(self.whose_turn()) == 0 and not self.finished():
 			# If all cards are exhausted, the winner of the last trick wins the game
-			state.__set_points(leader, 66)
+			self.__set_points(leader, 66)
 
 		#Draw cards from stock
-		if state.__phase == 1:
-			state.__deck.draw_card(leader)
-			state.__deck.draw_card(util.other(leader))
-			if state.__deck.get_stock_size() == 0:
-				state.__phase = 2
+		if self.__phase == 1:
+			self.__deck.draw_card(leader)
+			self.__deck.draw_card(util.other(leader))
+			if self.__deck.get_stock_size() == 0:
+				self.__phase = 2
 
 
 		# Set player1s_turn according to the leader variable
-		state.__player1s_turn = True if leader == 1 else False
-
-		# Returns state
-		return state
+		self.__player1s_turn = True if leader == 1 else False
 
 	def finished(self):
 		"""
@@ -205,37 +296,35 @@ class State:
 					second element is the index of that trump jack
 		"""
 
-		hand = self.hand()
+		# The hand is represented as a mask in which bit i is set if card i is in the hand,
+		# so that the cards that may be played can be selected with a few bitwise ANDs.
+		hand = self.__deck.get_player_hand_mask(self.whose_turn())
 
-		if self.__signature is not None and len(hand) == 0:
+		if self.__signature is not None and hand == 0:
 			raise RuntimeError("\n\nGame is in phase 1. Insufficient information to derive any of the opponent's possible moves. Try to make an assumption\n")
 
-		possible_moves = []
-
 		# In this case, no constraints are put on the move
 		if self.__phase == 1 or self.whose_turn() == self.leader():
 
-			for card in hand:
-				possible_moves.append((card, None))
+			playable_cards = hand
 
 		# If the game is in phase 2 and it's not the leader's turn, then some constraints apply
 		else:
 			opponent_card = self.get_opponents_played_card()
-			same_suit_hand = [card for card in hand if Deck.get_suit(card) == Deck.get_suit(opponent_card)]
-			playable_cards = None
+			same_suit_hand = hand & _SUIT_MASKS[opponent_card]
 
-			if len(same_suit_hand) > 0:
-				same_suit_hand_higher = [card for card in same_suit_hand if card < opponent_card]
+			if same_suit_hand != 0:
+				same_suit_hand_higher = same_suit_hand & _HIGHER_MASKS[opponent_card]
 
-				if len(same_suit_hand_higher) > 0:
+				if same_suit_hand_higher != 0:
 					playable_cards = same_suit_hand_higher
 
 				else:
 					playable_cards = same_suit_hand
 
 			elif Deck.get_suit(opponent_card) != self.__deck.get_trump_suit():
-				trump_hand = [card for card in hand if Deck.get_suit(card) == self.__deck.get_trump_suit()]
-				if len(trump_hand) > 0:
+				trump_hand = hand & _SUIT_MASKS[self.__deck.get_trump_jack_index()]
+				if trump_hand != 0:
 
 					playable_cards = trump_hand
 
@@ -245,7 +334,7 @@ class State:
 			else:
 				playable_cards = hand
 
-			possible_moves = [(card, None) for card in playable_cards]
+		possible_moves = [(card, None) for card in _indices(playable_cards)]
 
 		#Add possible trump jack exchanges and mariages to moves
 		#Marriages and exchanges can only be made by the leading player
@@ -414,6 +503,32 @@ class State:
 		"""
 		return self.__phase
 
+	def get_hash(self, player=None):
+		"""
+		Returns a 64-bit Zobrist hash of this state, which can be used as a key
+		for transposition tables and caches. Equal states always have equal hashes.
+		The hash of the deck is kept up to date as moves are played, the other parts
+		of the state are added in constant time.
+
+		:param player: The player id of the player whose knowledge the hash should cover.
+			For signed states this defaults to the signing player, so that all states
+			the player cannot tell apart get the same hash. Otherwise, the hash covers
+			the full state.
+		"""
+		hash_value = self.__deck.get_hash(player)
+
+		if self.__player1s_turn:
+			hash_value ^= _TURN_KEY
+		if self.__leads_turn:
+			hash_value ^= _LEADS_KEY
+		if self.__phase == 2:
+			hash_value ^= _PHASE_KEY
+
+		hash_value ^= _POINTS_KEYS[0][self.__p1_points] ^ _POINTS_KEYS[1][self.__p2_points]
+		hash_value ^= _PENDING_KEYS[0][self.__p1_pending_points] ^ _PENDING_KEYS[1][self.__p2_pending_points]
+
+		return hash_value ^ _REVOKED_KEYS[self.__revoked]
+
 	def make_assumption(self):
 		"""
 		Takes the current imperfect information state and makes a 
@@ -430,6 +545,62 @@ class State:
 
 		return state
 
+	def make_assumptions(self, n, seed=None, distinct=False):
+		"""
+		Takes the current imperfect information state and makes n
+		random guesses as to the states of the unknown cards. This is
+		much cheaper than calling make_assumption() n times.
+		:param n: The number of guesses
+		:param seed: Optional random number generator seed
+		:param distinct: If True, no two guesses deal the unknown cards in the same way.
+			Fewer than n states are returned when there are fewer possible deals.
+		:return: A list of perfect information state objects.
+		"""
+		if self.__signature is None:
+			raise RuntimeError("\n\nCannot make assumption, already have perfect knowledge. Try this in phase 1 or with an un-assumed state")
+
+		return [self.__with_deck(deck) for deck in self.__deck.make_assumptions(n, seed, distinct)]
+
+	def enumerate_assumptions(self, threshold=120, n=None, seed=None):
+		"""
+		Takes the current imperfect information state and returns the perfect
+		information states it may be in, with how often each of them occurs.
+		If there are at most threshold ways to deal the unknown cards, every deal
+		is returned once, so expectations over the result are exact. Otherwise,
+		n deals are sampled and deals drawn more than once are merged.
+		:param threshold: The largest number of deals to enumerate
+		:param n: The number of deals to sample otherwise, defaults to threshold
+		:param seed: Optional random number generator seed for sampling
+		:return: A list of (state, count) pairs. The expected value of f is
+			sum(count * f(state)) / sum(count).
+		"""
+		if self.__signature is None:
+			raise RuntimeError("\n\nCannot make assumption, already have perfect knowledge. Try this in phase 1 or with an un-assumed state")
+
+		if self.__deck.count_deals() <= threshold:
+			return [(self.__with_deck(deck), 1) for deck in self.__deck.make_all_assumptions()]
+
+		counts = {}
+		for state in self.make_assumptions(threshold if n is None else n, seed):
+			key = state.get_hash()
+
+			if key in counts:
+				counts[key][1] += 1
+			else:
+				counts[key] = [state, 1]
+
+		return [(state, count) for state, count in counts.values()]
+
+	def count_deals(self):
+		"""
+		:return: The number of different ways in which the unknown cards can be dealt,
+			as seen by the player that signed this state.
+		"""
+		if self.__signature is None:
+			return 1
+
+		return self.__deck.count_deals()
+
 	def __is_valid(self, move):
 		"""
 		:param move: tuple representing move
@@ -439,6 +610,32 @@ class State:
 			return (self.__deck.get_card_state(move[0]) == ("P" + str(self.whose_turn()) + "H"))
 		return move in self.moves()
 
+	def __with_deck(self, deck):
+		"""
+		:return: A perfect information state with the given deck and the other fields of this state
+		"""
+		state = State(deck, self.__player1s_turn, self.__p1_points, self.__p2_points, self.__p1_pending_points, self.__p2_pending_points)
+		state.__phase = self.__phase
+		state.__leads_turn = self.__leads_turn
+		state.__revoked = self.__revoked
+
+		return state
+
+	def __save(self):
+		"""
+		:return: A record of everything a move can change in this state
+		"""
+		return self.__deck.save(), self.__phase, self.__leads_turn, self.__player1s_turn, self.__p1_points, self.__p2_points, self.__p1_pending_points, self.__p2_pending_points, self.__revoked
+
+	def __restore(self, saved):
+		"""
+		Puts this state back in the situation it was in when the given record was saved
+
+		:param saved: A record returned by __save
+		"""
+		deck, self.__phase, self.__leads_turn, self.__player1s_turn, self.__p1_points, self.__p2_points, self.__p1_pending_points, self.__p2_pending_points, self.__revoked = saved
+		self.__deck.restore(deck)
+
 	def __exchange_trump(self, trump_jack_index):
 		"""
 		Exchanges the trump card with the trump Jack.
@@ -589,3 +786,6 @@ class State:
 
 	def __ne__(self, o):
 		return not (self.__deck == o.__deck and self.__phase == o.__phase and self.__leads_turn == o.__leads_turn and self.__player1s_turn == o.__player1s_turn and self.__p1_points == o.__p1_points and self.__p2_points == o.__p2_points and self.__p1_pending_points == o.__p1_pending_points and self.__p2_pending_points == o.__p2_pending_points and self.__signature == o.__signature and self.__revoked == o.__revoked)
+
+	def __hash__(self):
+		return self.get_hash()
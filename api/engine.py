@@ -2,8 +2,8 @@
 This file contains functions to regulate game play.
 """
 from api import State, Deck, util
-from multiprocessing import Process, Manager
-import random
+from multiprocessing import Process, Manager, Pipe, util as mputil
+import random, traceback, os, signal
 
 
 def play(
@@ -71,11 +71,23 @@ def play(
 def get_move(state, player, max_time, verbose):
     """
     Asks a player bot for a move. Creates a separate process, so we can kill
-    computation if it exceeds a maximum time.
+    computation if it exceeds a maximum time. If the player is a Worker, its
+    process is reused instead.
     :param state:
     :param player:
     :return:
     """
+    if isinstance(player, Worker):
+        # Advance the global PRNG like below, so that games play out the same with and without workers
+        random.random()
+        move = player.get_move(state, max_time, random.getstate())
+
+        if move == "Late":
+            pr('!   Player {} took too long, game revoked.'.format(
+                state.whose_turn()), verbose)
+
+        return move
+
     # We call the player bot in a separate process.This allows us to terminate
     # if the player takes too long.
     manager = Manager()
@@ -122,6 +134,113 @@ def call_player(player, state, randomState, result):
     result['move'] = move
 
 
+class Worker:
+    """
+    Keeps a bot in a long-lived process, so that the engine can enforce the maximum
+    time per move without starting a new process for every move. States are sent to the
+    process over a pipe and the moves are sent back. The process is only killed, and
+    started again for the next move, when the bot takes too long.
+
+    A worker can be passed to play() in place of the bot it wraps. Call stop() when it
+    is no longer needed.
+    """
+
+    def __init__(self, player):
+        self.__player = player
+        self.__process = None
+        self.__connection = None
+
+        # The process is not a daemon, so that bots can start processes of their own.
+        # Make sure it does not outlive the program. A multiprocessing finalizer is used
+        # rather than atexit, because it also runs when the worker was created in a child
+        # process (such as a tournament's process pool), before that process waits for its
+        # own children to end.
+        mputil.Finalize(None, self.stop, exitpriority=10)
+
+    def get_move(self, state, max_time=None, random_state=None):
+        """
+        Asks the bot in the worker process for a move.
+        :param state: The state to pass to the bot
+        :param max_time: The maximum time in milliseconds to wait for the move, None waits indefinitely
+        :param random_state: If given, the global PRNG of the worker process is set to this state first
+        :return: The move, None if the bot failed, or "Late" if it took too long
+        """
+        if self.__process is None:
+            self.start()
+
+        self.__connection.send((state, random_state))
+
+        if not self.__connection.poll(None if max_time is None else max_time / 1000):
+            self.stop()
+            return "Late"
+
+        try:
+            return self.__connection.recv()
+        except EOFError:
+            # The process died, start a new one for the next move
+            self.stop()
+            return None
+
+    def start(self):
+        """
+        Starts the worker process. This is done automatically when the first move is asked.
+        """
+        self.__connection, child_connection = Pipe()
+
+        self.__process = Process(target=serve_player, args=(self.__player, child_connection))
+        self.__process.start()
+
+        child_connection.close()
+
+    def stop(self):
+        """
+        Kills the worker process.
+        """
+        if self.__process is None:
+            return
+
+        # Kill the process group of the worker, so that processes started by the bot go as well
+        try:
+            os.killpg(self.__process.pid, signal.SIGTERM)
+        except (AttributeError, ProcessLookupError, PermissionError):
+            self.__process.terminate()
+
+        self.__process.join()
+        self.__connection.close()
+
+        self.__process = None
+        self.__connection = None
+
+    def __str__(self):
+        return str(self.__player)
+
+
+def serve_player(player, connection):
+    """
+    The loop running in a worker process: receive a state, call the player, send back the move.
+    """
+    # Start a process group, so the worker can be killed together with any processes the bot starts
+    if hasattr(os, 'setpgrp'):
+        os.setpgrp()
+
+    while True:
+        try:
+            state, random_state = connection.recv()
+        except EOFError:
+            return
+
+        if random_state is not None:
+            random.setstate(random_state)
+
+        try:
+            move = player.get_move(state)
+        except Exception:
+            traceback.print_exc()
+            move = None
+
+        connection.send(move)
+
+
 def pr(string, verbose):
     """
     Print the given message if verbose is true, otherwise ignore.
@@ -0,0 +1,128 @@
+"""
+Exact solver for phase 2. Once the stock is exhausted both players know where
+every card is, so the game can be searched to the end. The solver returns the
+game points the game is worth with optimal play from both sides.
+"""
+
+# The kinds of values stored in the memo
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+class Solver:
+    """
+    Solves phase 2 states with an alpha-beta search to the end of the game.
+    Results are memoized by state hash, so positions that are reached through
+    different trick orders, or again in a later call, are only searched once.
+    """
+
+    def __init__(self, max_size=2**20):
+        """
+        :param int max_size: The maximum number of states to memoize. The memo is cleared when it grows beyond this.
+        """
+        self.__max_size = max_size
+        self.__memo = {}
+
+    def solve(self, state):
+        # type: (State) -> tuple[int, tuple[int, int]]
+        """
+        :param State state: A phase 2 state with perfect information
+        :return val, move: The game points that player 1 will win with optimal play, negative if player 2
+            wins them, and an optimal move. The move is None if the game is finished.
+        """
+        if state.get_phase() != 2:
+            raise RuntimeError('The solver can only solve states in phase 2.')
+
+        # The search plays moves on the state in place
+        state = state.clone()
+
+        if len(self.__memo) > self.__max_size:
+            self.__memo.clear()
+
+        # Game values are -3 to 3, so this window is never exceeded
+        return self.__search(state, -4, 4)
+
+    def value(self, state, player):
+        # type: (State, int) -> int
+        """
+        :return: The game points that the given player will win with optimal play, negative if they lose.
+        """
+        val, _ = self.solve(state)
+        return val if player == 1 else -val
+
+    def best_move(self, state):
+        # type: (State) -> tuple[int, int]
+        """
+        :return: An optimal move for the player whose turn it is.
+        """
+        _, move = self.solve(state)
+        return move
+
+    def clear(self):
+        """
+        Forget all memoized states.
+        """
+        self.__memo.clear()
+
+    def __search(self, state, alpha, beta):
+
+        if state.finished():
+            winner, points = state.winner()
+            return (points, None) if winner == 1 else (-points, None)
+
+        key = state.get_hash()
+        entry = self.__memo.get(key)
+        memo_move = None
+
+        if entry is not None:
+            kind, entry_value, memo_move = entry
+
+            if kind == EXACT:
+                return entry_value, memo_move
+            elif kind == LOWER:
+                alpha = max(alpha, entry_value)
+            else:
+                beta = min(beta, entry_value)
+
+            if alpha >= beta:
+                return entry_value, memo_move
+
+        original_alpha, original_beta = alpha, beta
+
+        maximizing = state.whose_turn() == 1
+        best_value = -4 if maximizing else 4
+        best_move = None
+
+        moves = state.moves()
+
+        # Search the best move found before first, it prunes the most
+        if memo_move in moves:
+            moves.remove(memo_move)
+            moves.insert(0, memo_move)
+
+        for move in moves:
+            state.apply(move)
+            val, _ = self.__search(state, alpha, beta)
+            state.undo()
+
+            if maximizing:
+                if val > best_value:
+                    best_value, best_move = val, move
+                    alpha = max(alpha, val)
+            else:
+                if val < best_value:
+                    best_value, best_move = val, move
+                    beta = min(beta, val)
+
+            if alpha >= beta:
+                break
+
+        if best_value <= original_alpha:
+            kind = UPPER
+        elif best_value >= original_beta:
+            kind = LOWER
+        else:
+            kind = EXACT
+
+        self.__memo[key] = (kind, best_value, best_move)
+
+        return best_value, best_move
@@ -7,16 +7,33 @@
 from api import State, util
 import random
 
+# The kinds of values stored in the transposition table
+EXACT, LOWER, UPPER = 0, 1, 2
+
 class Bot:
 
     __max_depth = -1
     __randomize = True
+    __table = None
 
-    def __init__(self, randomize=True, depth=8):
+    def __init__(self, randomize=True, depth=8, table_size=None):
+        """
+        :param bool randomize: Whether to shuffle the moves before searching them
+        :param int depth: How deep to search, -1 searches until the end of the game
+        :param int table_size: The number of entries in the transposition table, None or 0
+            (the default) disables it. The table is kept for all moves of the bot, across games.
+        """
         self.__randomize = randomize
         self.__max_depth = depth
 
+        if table_size:
+            self.__table = TranspositionTable(table_size)
+
     def get_move(self, state):
+        # Entries of earlier searches stay valid, but make room for the positions of this one
+        if self.__table is not None:
+            self.__table.new_search()
+
         val, move = self.value(state)
 
         return move
@@ -38,6 +55,35 @@ class Bot:
         if depth == self.__max_depth:
             return heuristic(state)
 
+        # How many more plies will be searched below this state. An unlimited search
+        # is always deeper than a limited one.
+        remaining = self.__max_depth - depth if self.__max_depth >= 0 else float('inf')
+
+        table = self.__table
+        table_move = None
+
+        if table is not None:
+            key = state.get_hash()
+            entry = table.get(key)
+
+            if entry is not None:
+                entry_depth, kind, entry_value, table_move = entry
+
+                # A value found by an equally deep search can be used directly, or at
+                # least narrows the window
+                if entry_depth >= remaining:
+                    if kind == EXACT:
+                        return entry_value, table_move
+                    elif kind == LOWER:
+                        alpha = max(alpha, entry_value)
+                    else:
+                        beta = min(beta, entry_value)
+
+                    if alpha >= beta:
+                        return entry_value, table_move
+
+            original_alpha, original_beta = alpha, beta
+
         best_value = float('-inf') if maximizing(state) else float('inf')
         best_move = None
 
@@ -46,29 +92,91 @@ class Bot:
         if self.__randomize:
             random.shuffle(moves)
 
+        # The best move of an earlier search is likely to be the best move now, and
+        # searching it first prunes the most
+        if table_move in moves:
+            moves.remove(table_move)
+            moves.insert(0, table_move)
+
         for move in moves:
 
-            next_state = state.next(move)
-            value, _ = self.value(next_state)
+            # Play the move on the state itself and take it back after evaluating it,
+            # so no new state has to be created for every node in the tree
+            state.apply(move)
+            value, _ = self.value(state, alpha, beta, depth + 1)
+            state.undo()
 
             if maximizing(state):
                 if value > best_value:
                     best_value = value
                     best_move = move
-                    alpha = best_value
+                    alpha = max(alpha, best_value)
             else:
                 if value < best_value:
                     best_value = value
                     best_move = move
-                    beta = best_value
+                    beta = min(beta, best_value)
 
             # Prune the search tree
             # We know this state will never be chosen, so we stop evaluating its children
-            if alpha > beta:
+            if alpha >= beta:
                 break
 
+        if table is not None:
+            # A search that was cut off only bounds the true value of the state
+            if best_value <= original_alpha:
+                kind = UPPER
+            elif best_value >= original_beta:
+                kind = LOWER
+            else:
+                kind = EXACT
+
+            table.put(key, remaining, kind, best_value, best_move)
+
         return best_value, best_move
 
+class TranspositionTable:
+    """
+    A fixed size table of search results, indexed by the hash of a state. Each
+    key maps to a single slot, and when two states compete for the same slot the
+    result of the deeper search is kept. Results of earlier searches are always
+    replaced.
+    """
+
+    def __init__(self, size):
+        self.__size = size
+        self.__slots = [None] * size
+        self.__generation = 0
+
+    def new_search(self):
+        self.__generation += 1
+
+    def get(self, key):
+        """
+        :param int key: The hash of a state
+        :return: A tuple (depth, kind, value, move), or None if the state is not in the table.
+        """
+        entry = self.__slots[key % self.__size]
+
+        if entry is None or entry[0] != key:
+            return None
+
+        return entry[2:]
+
+    def put(self, key, depth, kind, value, move):
+        """
+        :param int key: The hash of a state
+        :param depth: How many plies were searched below the state
+        :param int kind: Whether value is EXACT, a LOWER bound or an UPPER bound
+        :param float value: The value found by the search
+        :param move: The best move found by the search
+        """
+        index = key % self.__size
+        entry = self.__slots[index]
+
+        if entry is None or entry[1] != self.__generation or entry[0] == key or depth >= entry[2]:
+            self.__slots[index] = (key, self.__generation, depth, kind, value, move)
+
 def maximizing(state):
     # type: (State) -> bool
     """
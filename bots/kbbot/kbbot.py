@@ -16,7 +16,14 @@ from .kb import KB, Boolean, Integer
 class Bot:
 
     def __init__(self):
-        pass
+        # The knowledge base is loaded once and reused for every move
+        self.kb = KB()
+
+        # Add general information about the game
+        load.general_information(self.kb)
+
+        # Add the necessary knowledge about the strategy
+        load.strategy_knowledge(self.kb)
 
     def get_move(self, state):
 
@@ -24,9 +31,12 @@ class Bot:
 
         random.shuffle(moves)
 
-        for move in moves:
+        # Finds out for all moves at once whether their strategy variable is entailed by the kb
+        entailed = self.kb.entailed([self.strategy_variable(move) for move in moves])
 
-            if not self.kb_consistent(state, move):
+        for move, is_entailed in zip(moves, entailed):
+
+            if is_entailed:
                 # Plays the first move that makes the kb inconsistent. We do not take
                 # into account that there might be other valid moves according to the strategy.
                 # Uncomment the next line if you want to see that something happens.
@@ -41,14 +51,16 @@ class Bot:
     def kb_consistent(self, state, move):
     # type: (State, move) -> bool
 
-        # each time we check for consistency we initialise a new knowledge-base
-        kb = KB()
+        strategy_variable = self.strategy_variable(move)
 
-        # Add general information about the game
-        load.general_information(kb)
+        # Assume the negation of the strategy variable. This is the same as adding
+        # the clause ~strategy_variable, but leaves the loaded knowledge base unchanged.
+        # If the knowledge base is not satisfiable, the strategy variable is
+        # entailed (proof by refutation)
+        return self.kb.satisfiable(assumptions=[~strategy_variable])
 
-        # Add the necessary knowledge about the strategy
-        load.strategy_knowledge(kb)
+    def strategy_variable(self, move):
+    # type: (move) -> Boolean
 
         # This line stores the index of the card in the deck.
         # If this doesn't make sense, refer to _deck.py for the card index mapping
@@ -61,11 +73,4 @@ class Bot:
         # PlayJack heuristics that was defined in class. Initialise a different variable if 
         # you want to apply a different strategy (that you will have to define in load.py)
         variable_string = "pj" + str(index)
-        strategy_variable = Boolean(variable_string)
-
-        # Add the relevant clause to the loaded knowledge base
-        kb.add_clause(~strategy_variable)
-
-        # If the knowledge base is not satisfiable, the strategy variable is
-        # entailed (proof by refutation)
-        return kb.satisfiable()
+        return Boolean(variable_string)
@@ -53,11 +53,15 @@ class Bot:
 
         for move in moves:
 
-            next_state = state.next(move)
+            # Play the move on the state itself, and take it back
+            # again once we know the value of the resulting state
+            state.apply(move)
 
             # IMPLEMENT: Add a recursive function call so that 'value' will contain the
-            # minimax value of 'next_state'
-            value, _ = self.value(next_state)
+            # minimax value of the state after the move
+            value, _ = self.value(state)
+
+            state.undo()
 
             if maximizing(state):
                 if value > best_value:
@@ -0,0 +1,116 @@
+"""
+Reading and writing datasets for training the ml bot.
+
+A dataset is a directory with the feature matrix and the labels in separate raw
+binary files, and a small json file describing them:
+
+    features.f32 -- the feature vectors, one row of FEATURE_LENGTH float32 values per state
+    labels.i8    -- the label of every row as an int8: 1 if player 1 won, -1 if player 2 won
+    meta.json    -- the number of rows, the data types and the layout of the feature vectors
+
+Both files can be memory-mapped, so a dataset does not have to fit in memory, and rows can
+be appended to them. The number of rows in meta.json is only updated after the rows have been
+written, so a dataset that was interrupted while appending is still valid.
+"""
+
+import json, os
+import numpy as np
+
+from bots.ml.ml import FEATURE_LENGTH, FEATURE_LAYOUT
+
+FEATURES_FILE = 'features.f32'
+LABELS_FILE = 'labels.i8'
+META_FILE = 'meta.json'
+
+# The labels for a win and a loss of player 1
+WON, LOST = 1, -1
+
+def create(path):
+    """
+    Create an empty dataset, replacing any dataset at the given path.
+
+    :param path: The directory of the dataset
+    """
+    os.makedirs(path, exist_ok=True)
+
+    open(os.path.join(path, FEATURES_FILE), 'wb').close()
+    open(os.path.join(path, LABELS_FILE), 'wb').close()
+
+    write_meta(path, 0)
+
+def append(path, features, labels):
+    """
+    Add rows to the end of a dataset.
+
+    :param path: The directory of the dataset
+    :param features: A matrix with a feature vector per row
+    :param labels: The label of each row, WON or LOST
+    """
+    features = np.asarray(features, dtype=np.float32)
+    labels = np.asarray(labels, dtype=np.int8)
+
+    if features.shape != (len(labels), FEATURE_LENGTH):
+        raise ValueError('Expected {} rows of {} features, got a matrix of shape {}'.format(len(labels), FEATURE_LENGTH, features.shape))
+
+    rows = read_meta(path)['rows']
+
+    # Cut off any rows written after the last update of the metadata
+    with open(os.path.join(path, FEATURES_FILE), 'r+b') as file:
+        file.truncate(rows * FEATURE_LENGTH * features.itemsize)
+        file.seek(0, os.SEEK_END)
+        file.write(features.tobytes())
+
+    with open(os.path.join(path, LABELS_FILE), 'r+b') as file:
+        file.truncate(rows * labels.itemsize)
+        file.seek(0, os.SEEK_END)
+        file.write(labels.tobytes())
+
+    write_meta(path, rows + len(labels))
+
+def load(path, mode='r'):
+    """
+    Memory-map a dataset.
+
+    :param path: The directory of the dataset
+    :param mode: The mode of the memory maps, see numpy.memmap
+    :return: A (rows, FEATURE_LENGTH) float32 matrix of features and an int8 array of labels
+    """
+    rows = read_meta(path)['rows']
+
+    if rows == 0:
+        return np.zeros((0, FEATURE_LENGTH), dtype=np.float32), np.zeros(0, dtype=np.int8)
+
+    features = np.memmap(os.path.join(path, FEATURES_FILE), dtype=np.float32, mode=mode, shape=(rows, FEATURE_LENGTH))
+    labels = np.memmap(os.path.join(path, LABELS_FILE), dtype=np.int8, mode=mode, shape=(rows,))
+
+    return features, labels
+
+def read_meta(path):
+    """
+    :return: The metadata of the dataset as a dict
+    """
+    with open(os.path.join(path, META_FILE)) as file:
+        meta = json.load(file)
+
+    if meta['feature_length'] != FEATURE_LENGTH:
+        raise ValueError('The dataset at {} has feature vectors of length {}, but the ml bot uses {}'.format(path, meta['feature_length'], FEATURE_LENGTH))
+
+    return meta
+
+def write_meta(path, rows):
+    meta = {
+        'rows': rows,
+        'feature_length': FEATURE_LENGTH,
+        'features_dtype': 'float32',
+        'labels_dtype': 'int8',
+        'labels': {'won': WON, 'lost': LOST},
+        'layout': [{'name': name, 'start': start, 'length': length} for name, start, length in FEATURE_LAYOUT],
+    }
+
+    # Replace the file in one step, so it is never left half written
+    temporary = os.path.join(path, META_FILE + '.tmp')
+
+    with open(temporary, 'w') as file:
+        json.dump(meta, file, indent=4)
+
+    os.replace(temporary, os.path.join(path, META_FILE))
@@ -6,14 +6,27 @@ A basic adaptive bot. This is part of the third worksheet.
 
 from api import State, util
 import random, os
-from itertools import chain
 
-import joblib
+import numpy as np
+
+from bots.ml.network import Network
 
 # Path of the model we will use. If you make a model
 # with a different name, point this line to its path.
 DEFAULT_MODEL = os.path.dirname(os.path.realpath(__file__)) + '/model.pkl'
 
+def exported_model(model_file):
+    """
+    :return: The path of the weights exported from the given model (.npz), which load much faster,
+        if they exist and are not older than the model itself. Otherwise the given path.
+    """
+    exported = os.path.splitext(model_file)[0] + '.npz'
+
+    if os.path.isfile(exported) and (not os.path.isfile(model_file) or os.path.getmtime(exported) >= os.path.getmtime(model_file)):
+        return exported
+
+    return model_file
+
 class Bot:
 
     __randomize = True
@@ -22,11 +35,27 @@ class Bot:
 
     def __init__(self, randomize=True, model_file=DEFAULT_MODEL):
 
+        # Use the faster export of the default model when it is up to date
+        if model_file == DEFAULT_MODEL:
+            model_file = exported_model(model_file)
+
         print(model_file)
         self.__randomize = randomize
 
-        # Load the model
-        self.__model = joblib.load(model_file)
+        # Load the model. Models exported to .npz are evaluated with NumPy only, other
+        # models are loaded with joblib, which imports sklearn.
+        if model_file.endswith('.npz'):
+            self.__model = Network(model_file)
+        else:
+            import joblib
+            self.__model = joblib.load(model_file)
+
+        # These are the classes: ('won', 'lost'), or (1, -1) for models trained on
+        # a columnar dataset. Look up once where their probabilities are in the
+        # predictions of the model.
+        classes = list(self.__model.classes_)
+        self.__won = classes.index('won') if 'won' in classes else classes.index(1)
+        self.__lost = classes.index('lost') if 'lost' in classes else classes.index(-1)
 
     def get_move(self, state):
 
@@ -49,14 +78,11 @@ class Bot:
         if self.__randomize:
             random.shuffle(moves)
 
-        for move in moves:
-
-            next_state = state.next(move)
+        # Predict the values of all next states at once: a single call to the
+        # model is much cheaper than one call per move
+        values = self.heuristics([state.next(move) for move in moves])
 
-            # IMPLEMENT: Add a function call so that 'value' will
-            # contain the predicted value of 'next_state'
-            # NOTE: This is different from the line in the minimax/alphabeta bot
-            value = self.heuristic(next_state)
+        for move, value in zip(moves, values):
 
             if maximizing(state):
                 if value > best_value:
@@ -71,20 +97,20 @@ class Bot:
 
     def heuristic(self, state):
 
-        # Convert the state to a feature vector
-        feature_vector = [features(state)]
+        return self.heuristics([state])[0]
 
-        # These are the classes: ('won', 'lost')
-        classes = list(self.__model.classes_)
+    def heuristics(self, states):
+        """
+        :param states: A list of states
+        :return: An array with the predicted value of each state, between -1.0 (lost) and 1.0 (won)
+        """
 
         # Ask the model for a prediction
-        # This returns a probability for each class
-        prob = self.__model.predict_proba(feature_vector)[0]
+        # This returns a probability for each class, for every state
+        probs = self.__model.predict_proba(feature_matrix(states))
 
         # Weigh the win/loss outcomes (-1 and 1) by their probabilities
-        res = -1.0 * prob[classes.index('lost')] + 1.0 * prob[classes.index('won')]
-
-        return res
+        return -1.0 * probs[:, self.__lost] + 1.0 * probs[:, self.__won]
 
 def maximizing(state):
     """
@@ -95,112 +121,147 @@ def maximizing(state):
     return state.whose_turn() == 1
 
 
-def features(state):
-    # type: (State) -> tuple[float, ...]
+# The parts of a feature vector as (name, length), in order. This table is the only place
+# that decides where a feature goes: features() writes every part at its offset in OFFSETS.
+FEATURE_PARTS = [
+    ('points', 2),
+    ('pending_points', 2),
+    ('phase', 1),
+    ('stock_size', 1),
+    ('leader', 1),
+    ('whose_turn', 1),
+    ('opponents_played_card', 1),
+    ('perspective_onehot', 120),
+    ('normalized_points', 2),
+    ('normalized_pending_points', 2),
+    ('trump_suit_onehot', 4),
+    ('phase_onehot', 2),
+    ('normalized_stock_size', 1),
+    ('leader_onehot', 2),
+    ('whose_turn_onehot', 2),
+    ('opponents_played_card_onehot', 21),
+]
+
+def layout(parts):
+    """
+    :param parts: A list of (name, length)
+    :return: The list of (name, start, length) of the parts when they are placed one after the other
+    """
+    result = []
+    start = 0
+
+    for name, length in parts:
+        result.append((name, start, length))
+        start += length
+
+    return result
+
+# The parts of a feature vector as (name, start, length)
+FEATURE_LAYOUT = layout(FEATURE_PARTS)
+
+# Position of the first element of each part
+OFFSETS = {name: start for name, start, _ in FEATURE_LAYOUT}
+
+# Length of a feature vector, see features()
+FEATURE_LENGTH = sum(length for _, length in FEATURE_PARTS)
+
+# Position of each card location in the one-hot encoding of a card
+LOCATIONS = {'U': 0, 'S': 1, 'P1H': 2, 'P2H': 3, 'P1W': 4, 'P2W': 5}
+
+# Position of the first element of the one-hot encoding of each card
+PERSPECTIVE_OFFSETS = OFFSETS['perspective_onehot'] + np.arange(0, 120, 6)
+
+def features(state, row=None):
+    # type: (State, np.ndarray) -> np.ndarray
     """
     Extract features from this state. Remember that every feature vector returned should have the same length.
 
     :param state: A state to be converted to a feature vector
-    :return: A tuple of floats: a feature vector representing this state.
+    :param row: Optional array of length FEATURE_LENGTH to write the features to, for instance a row of a larger matrix
+    :return: An array of floats: a feature vector representing this state.
     """
 
-    feature_set = []
+    # If you add a feature, add it to FEATURE_PARTS as well and write it at its offset in OFFSETS.
+    # The length of the feature vector and the positions of the other features follow from that table.
 
-    # Add player 1's points to feature set
-    p1_points = state.get_points(1)
-    feature_set.append(p1_points)
+    if row is None:
+        row = np.zeros(FEATURE_LENGTH)
+    else:
+        row[:] = 0.0
 
-    # Add player 2's points to feature set
+    p1_points = state.get_points(1)
     p2_points = state.get_points(2)
-    feature_set.append(p2_points)
-
-    # Add player 1's pending points to feature set
     p1_pending_points = state.get_pending_points(1)
-    feature_set.append(p1_pending_points)
-
-    # Add player 2's pending points to feature set
     p2_pending_points = state.get_pending_points(2)
-    feature_set.append(p2_pending_points)
-
-    # Get trump suit
     trump_suit = state.get_trump_suit()
-
-    # Add phase to feature set
     phase = state.get_phase()
-    feature_set.append(phase)
-
-    # Add stock size to feature set
     stock_size = state.get_stock_size()
-    feature_set.append(stock_size)
-
-    # Add leader to feature set
     leader = state.leader()
-    feature_set.append(leader)
-
-    # Add whose turn it is to feature set
     whose_turn = state.whose_turn()
-    feature_set.append(whose_turn)
-
-    # Add opponent's played card to feature set
     opponents_played_card = state.get_opponents_played_card()
-    feature_set.append(opponents_played_card)
-
 
+    # Add the points, pending points, phase, stock size, leader, whose turn it is and opponent's
+    # played card to the feature set. No card played is represented by 0.
+    row[OFFSETS['points']] = p1_points
+    row[OFFSETS['points'] + 1] = p2_points
+    row[OFFSETS['pending_points']] = p1_pending_points
+    row[OFFSETS['pending_points'] + 1] = p2_pending_points
+    row[OFFSETS['phase']] = phase
+    row[OFFSETS['stock_size']] = stock_size
+    row[OFFSETS['leader']] = leader
+    row[OFFSETS['whose_turn']] = whose_turn
+    row[OFFSETS['opponents_played_card']] = opponents_played_card if opponents_played_card is not None else 0
 
     ################## You do not need to do anything below this line ########################
 
-    perspective = state.get_perspective()
-
-    # Perform one-hot encoding on the perspective.
+    # Perform one-hot encoding on the perspective: for every card, one of six elements is set,
+    # in the order U, S, P1H, P2H, P1W, P2W.
     # Learn more about one-hot here: https://machinelearningmastery.com/how-to-one-hot-encode-sequence-data-in-python/
-    perspective = [card if card != 'U'   else [1, 0, 0, 0, 0, 0] for card in perspective]
-    perspective = [card if card != 'S'   else [0, 1, 0, 0, 0, 0] for card in perspective]
-    perspective = [card if card != 'P1H' else [0, 0, 1, 0, 0, 0] for card in perspective]
-    perspective = [card if card != 'P2H' else [0, 0, 0, 1, 0, 0] for card in perspective]
-    perspective = [card if card != 'P1W' else [0, 0, 0, 0, 1, 0] for card in perspective]
-    perspective = [card if card != 'P2W' else [0, 0, 0, 0, 0, 1] for card in perspective]
-
-    # Append one-hot encoded perspective to feature_set
-    feature_set += list(chain(*perspective))
+    perspective = state.get_perspective()
+    row[PERSPECTIVE_OFFSETS + [LOCATIONS[card] for card in perspective]] = 1
 
-    # Append normalized points to feature_set
+    # Normalized points
     total_points = p1_points + p2_points
-    feature_set.append(p1_points/total_points if total_points > 0 else 0.)
-    feature_set.append(p2_points/total_points if total_points > 0 else 0.)
+    row[OFFSETS['normalized_points']] = p1_points/total_points if total_points > 0 else 0.
+    row[OFFSETS['normalized_points'] + 1] = p2_points/total_points if total_points > 0 else 0.
 
-    # Append normalized pending points to feature_set
+    # Normalized pending points
     total_pending_points = p1_pending_points + p2_pending_points
-    feature_set.append(p1_pending_points/total_pending_points if total_pending_points > 0 else 0.)
-    feature_set.append(p2_pending_points/total_pending_points if total_pending_points > 0 else 0.)
+    row[OFFSETS['normalized_pending_points']] = p1_pending_points/total_pending_points if total_pending_points > 0 else 0.
+    row[OFFSETS['normalized_pending_points'] + 1] = p2_pending_points/total_pending_points if total_pending_points > 0 else 0.
 
-    # Convert trump suit to id and add to feature set
-    # You don't need to add anything to this part
+    # One-hot encoded trump suit
     suits = ["C", "D", "H", "S"]
-    trump_suit_onehot = [0, 0, 0, 0]
-    trump_suit_onehot[suits.index(trump_suit)] = 1
-    feature_set += trump_suit_onehot
+    row[OFFSETS['trump_suit_onehot'] + suits.index(trump_suit)] = 1
 
-    # Append one-hot encoded phase to feature set
-    feature_set += [1, 0] if phase == 1 else [0, 1]
+    # One-hot encoded phase
+    row[OFFSETS['phase_onehot'] + (0 if phase == 1 else 1)] = 1
 
-    # Append normalized stock size to feature set
-    feature_set.append(stock_size/10)
+    # Normalized stock size
+    row[OFFSETS['normalized_stock_size']] = stock_size/10
 
-    # Append one-hot encoded leader to feature set
-    feature_set += [1, 0] if leader == 1 else [0, 1]
+    # One-hot encoded leader
+    row[OFFSETS['leader_onehot'] + (0 if leader == 1 else 1)] = 1
 
-    # Append one-hot encoded whose_turn to feature set
-    feature_set += [1, 0] if whose_turn == 1 else [0, 1]
+    # One-hot encoded whose_turn
+    row[OFFSETS['whose_turn_onehot'] + (0 if whose_turn == 1 else 1)] = 1
 
-    # Append one-hot encoded opponent's card to feature set
-    opponents_played_card_onehot = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
-    opponents_played_card_onehot[opponents_played_card if opponents_played_card is not None else 20] = 1
-    feature_set += opponents_played_card_onehot
+    # One-hot encoded opponent's card, the last element meaning that no card was played
+    row[OFFSETS['opponents_played_card_onehot'] + (opponents_played_card if opponents_played_card is not None else 20)] = 1
+
+    return row
+
+def feature_matrix(states):
+    # type: (list[State]) -> np.ndarray
+    """
+    Extract the features of many states at once.
+
+    :param states: A list of states
+    :return: A matrix with the feature vector of each state as a row
+    """
+    matrix = np.empty((len(states), FEATURE_LENGTH))
 
-    # Prevents adding None values to the feature set
-    for index, element in enumerate(feature_set):
-        if element == None:
-            feature_set[index] = 0
+    for row, state in zip(matrix, states):
+        features(state, row)
 
-    # Return feature set
-    return feature_set
+    return matrix
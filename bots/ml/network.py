@@ -0,0 +1,71 @@
+"""
+Inference for trained multi-layer perceptrons with NumPy only.
+
+export() stores the weights of a trained sklearn MLPClassifier in a compact .npz
+file. Network loads such a file and computes the same predictions as the
+classifier, without sklearn's input validation, and without importing sklearn at all.
+"""
+
+import numpy as np
+
+ACTIVATIONS = {
+    'identity': lambda x: x,
+    'logistic': lambda x: 1.0 / (1.0 + np.exp(-x)),
+    'tanh': np.tanh,
+    'relu': lambda x: np.maximum(x, 0),
+}
+
+def export(model, path):
+    """
+    Store the weights of a trained MLPClassifier.
+
+    :param model: A fitted sklearn.neural_network.MLPClassifier
+    :param path: The .npz file to write to
+    """
+    arrays = {}
+
+    for i, (coef, intercept) in enumerate(zip(model.coefs_, model.intercepts_)):
+        arrays['coef_{}'.format(i)] = coef
+        arrays['intercept_{}'.format(i)] = intercept
+
+    np.savez(path,
+             layers=len(model.coefs_),
+             activation=model.activation,
+             out_activation=model.out_activation_,
+             classes=model.classes_,
+             **arrays)
+
+class Network:
+    """
+    A multi-layer perceptron loaded from a file written by export(). Offers the
+    classes_ and predict_proba() of the classifier it was exported from.
+    """
+
+    def __init__(self, path):
+        with np.load(path) as arrays:
+            layers = int(arrays['layers'])
+
+            self.__coefs = [arrays['coef_{}'.format(i)] for i in range(layers)]
+            self.__intercepts = [arrays['intercept_{}'.format(i)] for i in range(layers)]
+            self.__activation = ACTIVATIONS[str(arrays['activation'])]
+            self.__out_activation = str(arrays['out_activation'])
+
+            self.classes_ = arrays['classes']
+
+    def predict_proba(self, x):
+        """
+        :param x: A matrix with a feature vector per row
+        :return: A matrix with the probability of each class per row, in the order of classes_
+        """
+        for coef, intercept in zip(self.__coefs[:-1], self.__intercepts[:-1]):
+            x = self.__activation(x @ coef + intercept)
+
+        x = x @ self.__coefs[-1] + self.__intercepts[-1]
+
+        if self.__out_activation == 'softmax':
+            x = np.exp(x - x.max(axis=1, keepdims=True))
+            return x / x.sum(axis=1, keepdims=True)
+
+        # With two classes, the network outputs the probability of the second class
+        p = ACTIVATIONS[self.__out_activation](x)
+        return np.hstack([1 - p, p])
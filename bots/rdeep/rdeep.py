@@ -2,12 +2,14 @@
 RdeepBot - This bot looks ahead by following a random path down the game tree. That is,
  it assumes that all players have the same strategy as rand.py, and samples N random
  games following from a given move. It then ranks the moves by averaging the heuristics
- of the resulting states.
+ of the resulting states. Both with a fixed number of samples and with a time budget, the
+ move with the highest mean score is returned.
 """
 
 # Import the API objects
 from api import State, util
-import random
+from concurrent.futures import ProcessPoolExecutor
+import random, time
 
 
 class Bot:
@@ -16,10 +18,28 @@ class Bot:
 	__num_samples = -1
 	# How deep to sample
 	__depth = -1
-
-	def __init__(self, num_samples=4, depth=8):
+	# How many milliseconds to spend on a move, or None to take a fixed number of samples.
+	# This has to be below the engine's time limit per move, see anytime_move().
+	__max_time = None
+	# How many seconds of the time budget are kept free of sampling, for returning the move
+	__margin = 0.02
+	# How many processes to sample with. The moves are sent to the processes in one batch
+	# each, which only pays off when sampling a move takes well over a few milliseconds.
+	__processes = 1
+	# The pool of processes, started at the first move
+	__pool = None
+
+	def __init__(self, num_samples=4, depth=8, max_time=None, processes=1):
 		self.__num_samples = num_samples
 		self.__depth = depth
+		self.__max_time = max_time
+		self.__processes = processes
+
+	def __getstate__(self):
+		# The pool cannot be sent to another process, there a new one is started
+		state = self.__dict__.copy()
+		state.pop('_Bot__pool', None)
+		return state
 
 	def get_move(self, state):
 
@@ -33,35 +53,125 @@ class Bot:
 		# Shuffling the list of moves ensures that.
 		random.shuffle(moves)
 
-		best_score = float("-inf")
-		best_move = None
+		if self.__max_time is not None:
+			return self.anytime_move(state, moves, player)
+
+		# If we are in an imperfect information state, make assumptions. All of them are
+		# made at once, and every move is evaluated on the same ones. When there are no more
+		# ways to deal the unknown cards than samples, every deal is evaluated once instead.
+		# Deals drawn more than once are evaluated once, and weighted by how often they were drawn.
+		if state.get_phase() == 1:
+			samples, weights = zip(*state.enumerate_assumptions(self.__num_samples))
+		else:
+			samples, weights = [state] * self.__num_samples, [1] * self.__num_samples
+
+		# Every move gets its own seed from the global PRNG, and its samples are evaluated with a
+		# generator seeded with it, so the outcome does not depend on the number of processes
+		n = len(moves)
+		states = [[sample_state.next(move) for sample_state in samples] for move in moves]
+		seeds = [random.randint(0, 100000) for _ in moves]
+
+		if self.__processes > 1:
+			# Send the moves to the processes in one batch each
+			chunksize = -(-n // self.__processes)
+			scores = self.pool().map(evaluate_seeded, [self] * n, states, [player] * n, seeds, chunksize=chunksize)
+		else:
+			scores = map(evaluate_seeded, [self] * n, states, [player] * n, seeds)
+
+		# Rank the moves by their mean score over the samples, as anytime_move() does
+		means = [sum(weight * score for weight, score in zip(weights, move_scores)) / sum(weights) for move_scores in scores]
+		best = max(range(n), key=lambda i: means[i])
+
+		return moves[best] # Return the best scoring move
+
+	def anytime_move(self, state, moves, player):
+		"""
+		Samples the moves until the time budget of the bot runs out, and returns the move with
+		the highest average score. With several processes, each of them samples all moves until
+		the time runs out, and their scores are added up.
+
+		Sampling stops a margin before the end of the budget, and before a playout that would
+		not end in time, but the engine also counts the time to send the state and the move
+		between processes. Give the bot a budget below the engine's limit per move, with
+		room to spare for that.
+		"""
+		if len(moves) == 1:
+			return moves[0]
+
+		deadline = time.time() + self.__max_time / 1000.0 - self.__margin
 
-		scores = [0.0] * len(moves)
+		if self.__processes > 1:
+			seeds = [random.randint(0, 100000) for _ in range(self.__processes)]
+			n = self.__processes
+			results = list(self.pool().map(sample_seeded, [self] * n, [state] * n, [moves] * n, [player] * n, [deadline] * n, seeds))
 
-		for move in moves:
-			for s in range(self.__num_samples):
+			totals = [sum(result[0][i] for result in results) for i in range(len(moves))]
+			counts = [sum(result[1][i] for result in results) for i in range(len(moves))]
+		else:
+			totals, counts = self.sample(state, moves, player, deadline)
 
-				# If we are in an imperfect information state, make an assumption.
+		# Until a move is evaluated, any move is as good as the others
+		if sum(counts) == 0:
+			return moves[0]
 
-				sample_state = state.make_assumption() if state.get_phase() == 1 else state
+		best = max((i for i in range(len(moves)) if counts[i] > 0), key=lambda i: totals[i] / counts[i])
+		return moves[best]
+
+	def sample(self, state, moves, player, deadline):
+		"""
+		Samples the moves round-robin until the deadline. Every round evaluates all moves with
+		one random game from the same assumption. The assumptions are made in batches of the
+		bot's number of samples, with State.make_assumptions().
+
+		:param deadline: The time.time() at which to stop
+		:return: The summed scores and the number of samples of each move
+		"""
+		totals = [0.0] * len(moves)
+		counts = [0] * len(moves)
 
-				score = self.evaluate(sample_state.next(move), player)
+		# The longest playout so far. No playout is started that would not end before the deadline
+		# if it took as long.
+		longest = 0.0
+		assumptions = []
 
-				if score > best_score:
-					best_score = score
-					best_move = move
+		while True:
+			if state.get_phase() == 1:
+				if not assumptions:
+					assumptions = state.make_assumptions(max(self.__num_samples, 1))
+				sample_state = assumptions.pop()
+			else:
+				sample_state = state
 
-		return best_move # Return the best scoring move
+			for i, move in enumerate(moves):
+				start = time.time()
+				if start + longest >= deadline:
+					return totals, counts
+
+				totals[i] += self.heuristic(sample_state.next(move).playout(self.__depth), player)
+				counts[i] += 1
+
+				longest = max(longest, time.time() - start)
+
+	def pool(self):
+		"""
+		:return: The pool of processes of this bot, which is kept for all moves
+		"""
+		if self.__pool is None:
+			self.__pool = ProcessPoolExecutor(self.__processes)
+
+		return self.__pool
 
 	def evaluate(self,
 				 state,     # type: State
-				 player     # type: int
+				 player,    # type: int
+				 rng=random
 			):
 		# type: () -> float
 		"""
 		Evaluates the value of the given state for the given player
 		:param state: The state to evaluate
 		:param player: The player for whom to evaluate this state (1 or 2)
+		:param rng: The random number generator for the playouts, by default the global one
 		:return: A float representing the value of this state for the given player. The higher the value, the better the
 			state is for the player.
 		"""
@@ -70,18 +180,29 @@ class Bot:
 
 		for _ in range(self.__num_samples):
 
-			st = state.clone()
-
 			# Do some random moves
-			for i in range(self.__depth):
-				if st.finished():
-					break
-
-				st = st.next(random.choice(st.moves()))
+			st = state.playout(self.__depth, rng)
 
 			score += self.heuristic(st, player)
 
 		return score/float(self.__num_samples)
 
 	def heuristic(self, state, player):
-		return util.ratio_points(state, player)
\ No newline at end of file
+		return util.ratio_points(state, player)
+
+def evaluate_seeded(bot, states, player, seed):
+	"""
+	Evaluates the given states with Bot.evaluate(), drawing the playouts from a generator with
+	the given seed, whichever process this runs in.
+
+	:return: The list of scores of the states
+	"""
+	rng = random.Random(seed)
+	return [bot.evaluate(state, player, rng) for state in states]
+
+def sample_seeded(bot, state, moves, player, deadline, seed):
+	"""
+	Bot.sample() with the global PRNG seeded first, for the processes of the pool.
+	"""
+	random.seed(seed)
+	return bot.sample(state, moves, player, deadline)
@@ -0,0 +1,26 @@
+"""
+SolverBot - Plays phase 2 perfectly by solving the game to the end with the exact
+solver in api.solver. Phase 1 has imperfect information, so there it plays like rdeep.
+"""
+
+from api import State
+from api.solver import Solver
+from bots.rdeep.rdeep import Bot as RdeepBot
+
+
+class Bot:
+
+    def __init__(self, max_size=2**20):
+        """
+        :param int max_size: The maximum number of phase 2 states the solver memoizes
+        """
+        self.__solver = Solver(max_size)
+        self.__phase1 = RdeepBot()
+
+    def get_move(self, state):
+        # type: (State) -> tuple[int, int]
+
+        if state.get_phase() == 1:
+            return self.__phase1.get_move(state)
+
+        return self.__solver.best_move(state)
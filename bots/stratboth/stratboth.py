@@ -19,7 +19,7 @@ class Bot:
 
     def __init__(self):
         self.passive = True
-        pass
+        self.kbs = {}  # strategy name -> knowledge base, loaded on first use
 
     def alphabeta_value(self, state, alpha=float('-inf'), beta=float('inf'), depth = 0):
         """Returns the value and associated move for a given state
@@ -169,31 +169,47 @@ class Bot:
             else:  # all remianing moves
                 other_moves.append(move)
         
-        for move in exchanges:
-            if not self.kb_consistent(state, move, "trumpex"):  # tells bot to load 'trump exchange' strategy file as kb
-                print("Trump exchange strategy applied")
-                return move  # Plays the first move that makes the kb inconsistent
-
-        for move in marriages:
-            if not self.kb_consistent(state, move, "marriage"):  # tells bot to load 'marriage' strategy file as kb
-                print("Marriage strategy applied")
-                return move  # Plays the first move that makes the kb inconsistent
+        for move in self.entailed_moves(exchanges, "trumpex"):  # tells bot to load 'trump exchange' strategy file as kb
+            print("Trump exchange strategy applied")
+            return move  # Plays the first move that makes the kb inconsistent
+
+        for move in self.entailed_moves(marriages, "marriage"):  # tells bot to load 'marriage' strategy file as kb
+            print("Marriage strategy applied")
+            return move  # Plays the first move that makes the kb inconsistent
         
         return self.standard_move(state, trump_moves, other_moves)
         
-    def kb_consistent(self, state, move, strategy):  # checks KB if move is part of strategy
-        kb = KB()
+    def strategy_kb(self, strategy):  # loads the KB of a strategy file once and reuses it for later moves
+        if strategy not in self.kbs:
+            kb = KB()
+
+            # load strategy file
+            path = f"bots.stratboth.load_{strategy}"
+            try:
+                load = importlib.import_module(path)
+            except:
+                print(f"ERROR: Could not load the python file {path}")
+
+            load.general_information(kb)
+            load.strategy_knowledge(kb)
+            self.kbs[strategy] = kb
 
-        # load strategy file
-        path = f"bots.stratboth.load_{strategy}"
-        try:
-            load = importlib.import_module(path)
-        except:
-            print(f"ERROR: Could not load the python file {path}")
+        return self.kbs[strategy]
 
-        load.general_information(kb)
-        load.strategy_knowledge(kb)
+    def entailed_moves(self, moves, strategy):  # returns the moves that are part of strategy, checked in a single KB query
+        entailed = self.strategy_kb(strategy).entailed([self.strategy_variable(move, strategy) for move in moves])
+        return [move for move, is_entailed in zip(moves, entailed) if is_entailed]
 
+    def kb_consistent(self, state, move, strategy):  # checks KB if move is part of strategy
+        kb = self.strategy_kb(strategy)
+        strategy_variable = self.strategy_variable(move, strategy)
+
+        # Assume the negation of the strategy variable, which leaves the loaded knowledge base unchanged.
+        # If the knowledge base is not satisfiable, the strategy variable is
+        # entailed (proof by refutation)
+        return kb.satisfiable(assumptions=[~strategy_variable])
+
+    def strategy_variable(self, move, strategy):  # returns the strategy variable of a move
         # This line stores the index of the card in the deck.
         # If this doesn't make sense, refer to _deck.py for the card index mapping
         index = move[1] if strategy == "trumpex" else move[0]
@@ -202,14 +218,7 @@ class Bot:
         # Note that as far as kb.py is concerned, two objects created with the same
         # string in the constructor are equivalent, and are seen as the same symbol.
         variable_string = "pc" + str(index)
-        strategy_variable = Boolean(variable_string)
-
-        # Add the relevant clause to the loaded knowledge base
-        kb.add_clause(~strategy_variable)
-
-        # If the knowledge base is not satisfiable, the strategy variable is
-        # entailed (proof by refutation)
-        return kb.satisfiable()
+        return Boolean(variable_string)
     
 def is_trump(state, move):
     return util.get_suit(move) == state.get_trump_suit() if move is not None else "None move"
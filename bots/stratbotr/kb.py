@@ -1,7 +1,33 @@
-import sys
+import sys, itertools, weakref
+from array import array
 import numpy as np
 import scipy.optimize as opt
 
+class _Name(object):
+    """
+    The interned id of a symbol name. Every Boolean holds the one of its name, which keeps the
+    name in the intern table for as long as a symbol with it exists.
+    """
+    __slots__ = ('id', '__weakref__')
+
+    def __init__(self, id):
+        self.id = id
+
+_names = weakref.WeakValueDictionary() # Symbol name -> _Name, while symbols with the name exist
+_next_id = itertools.count()
+
+def _intern(name):
+    """
+    Returns the interned id of a symbol name, assigning a new id the first time the name is seen.
+    Symbols with the same name get the same id, so they can be compared and hashed as ints instead
+    of as strings. A name is dropped from the table when no symbol with it is left, and gets a new
+    id if it is used again; ids are never reused.
+    """
+    entry = _names.get(name)
+    if entry is None:
+        entry = _names[name] = _Name(next(_next_id))
+    return entry
+
 class Symbol(object):
     """
     A class representing a single unit in the boolean SAT problem. This can either refer to an atomic boolean, or a
@@ -13,10 +39,19 @@ class Boolean(Symbol):
 
     def __init__(self, name):
         self.__name = name
+        self.__interned = _intern(name)
+        self.__id = self.__interned.id
 
     def name(self):
         return self.__name
 
+    def id(self):
+        return self.__id
+
+    def __reduce__(self):
+        # Interned ids differ between processes, so a pickled symbol is interned again by name
+        return Boolean, (self.__name,)
+
     def __invert__(self):
         # type: () -> Boolean
         """
@@ -26,15 +61,15 @@ class Boolean(Symbol):
         return _NegBoolean(self)
 
     def __eq__(self, other):
-        if isinstance(other, self.__class__):
-            return self.name() == other.name()
+        if other.__class__ is self.__class__:
+            return self.id() == other.id()
         return False
 
     def __ne__(self, other):
         return not self.__eq__(other)
 
     def __hash__(self):
-        return hash(self.name())
+        return self.id()
 
     def __repr__(self):
         return self.name()
@@ -47,19 +82,25 @@ class _NegBoolean(Boolean):
     def name(self):
         return self.__symbol.name()
 
+    def id(self):
+        return self.__symbol.id()
+
+    def __reduce__(self):
+        return _NegBoolean, (self.__symbol,)
+
     def __invert__(self):
         return self.__symbol
 
     def __eq__(self, other):
-        if isinstance(other, self.__class__):
-            return self.name() == other.name()
+        if other.__class__ is self.__class__:
+            return self.id() == other.id()
         return False
 
     def __ne__(self, other):
         return not self.__eq__(other)
 
     def __hash__(self):
-        return hash(self.name(), False)
+        return ~ self.id()
 
     def __repr__(self):
         return '~' + self.name()
@@ -391,16 +432,19 @@ class Constant(Integer):
     def allterms(self):
         return [self]
 
+_feasible_limit = 4096 # How many theory checks a KB caches at most
+
 class KB(object):
     """
     A class representing a knowledge base.
     """
 
     def __init__(self):
-        self._symbols = []
-        self._clauses = []
-        self._pos_occurrences = {}
-        self._neg_occurrences = {}
+        self._symbols = [] # The symbols of this KB, indexed by their id in the KB
+        self._ids = {} # Symbol -> id in the KB
+        self._clauses = [] # Clauses as arrays of literals, see _literal()
+        self._solver = None
+        self._feasible = {} # Active constraint literals -> whether they can hold together
 
     def add_clause(self, *symbols):
         """
@@ -431,185 +475,408 @@ class KB(object):
                     'Equality constraints may only occur in unit clauses (so kb.add_clause(x == 5, y > 3) is not allowed). Encountered clause {}'.format(clause))
 
 
-        index = len(self._clauses)
-        self._clauses.append(clause)
-
+        literals = array('i')
         for symbol in symbols:
 
             raw_symbol = ~symbol if isinstance(symbol, _NegBoolean) else symbol
 
-            if raw_symbol not in self._symbols:
+            if raw_symbol not in self._ids:
+                self._ids[raw_symbol] = len(self._symbols)
                 self._symbols.append(raw_symbol)
 
-            # Map symbols to the clauses they occur in
-            if raw_symbol not in self._neg_occurrences:
-                self._neg_occurrences[raw_symbol] = []
-            if raw_symbol not in self._pos_occurrences:
-                self._pos_occurrences[raw_symbol] = []
+            literals.append(self._literal(symbol))
 
-            if isinstance(symbol, _NegBoolean):
-                self._neg_occurrences[raw_symbol].append(index)
-            else:
-                self._pos_occurrences[raw_symbol].append(index)
+        self._clauses.append(literals)
+        self._solver = None
 
-    def satisfiable(self):
+    def satisfiable(self, assumptions=()):
         """
+        :param assumptions: Symbols or negated symbols that are assumed to be true for this query
+            only. Testing kb.satisfiable(assumptions=[~A]) gives the same answer as adding the clause
+            ~A and testing kb.satisfiable(), but the KB is left unchanged and can be queried again.
         :return: True if there is a way to assign values to the variables in this knowledge base with
             creating inconsistencies.
         """
-        first = next(self.models(), None)
+        models = self.models(assumptions=assumptions)
+        try:
+            return next(models, None) is not None
+        finally:
+            models.close()
 
-        return first is not None
-
-    def models(self, check_theory=True):
+    def models(self, check_theory=True, assumptions=()):
         """
         Generator for the models satisfying the current knowledge base
+        :param assumptions: Symbols or negated symbols that are assumed to be true
         :return:
         """
-        fringe = [_Node(self)]
+        literals = []
+        fixed = {} # Assumed symbols that do not occur in the clauses
+        for symbol in assumptions:
+            raw_symbol, value = (~symbol, False) if isinstance(symbol, _NegBoolean) else (symbol, True)
+            literal = self._literal(symbol)
+
+            if literal is not None:
+                literals.append(literal)
+            elif fixed.get(raw_symbol, value) != value:
+                return
+            else:
+                fixed[raw_symbol] = value
 
-        while len(fringe) > 0:
-            head = fringe.pop()
+        yield from self._models(literals, fixed, check_theory)
 
-            if head.consistent():
-                if head.finished():
-                    # the SAT problem returned a model,
-                    # check if the underlying theory is satisfiable
-                    sat_model = head.model()
+    def _models(self, literals, fixed=None, check_theory=True):
+        """
+        Generator for the models in which the given literals hold, see models()
+        :param fixed: Assumed values of symbols that do not occur in the clauses
+        :return:
+        """
+        solver = self.compile()
+        fixed = fixed or {}
+
+        # The underlying theory is checked during the search, whenever a constraint is assigned,
+        # so the solver only returns models that satisfy it
+        feasible = None
+        if check_theory:
+            constraints = frozenset((s, v) for s, v in fixed.items() if isinstance(s, Constraint))
+            feasible = lambda literals: self._theory_feasible(literals, constraints)
+
+        models = solver.models(literals, feasible)
+        try:
+            for model in models:
+                model.update(fixed)
+                yield model
+        finally:
+            models.close()
+
+    def __getstate__(self):
+        # The keys of _ids hash to interned ids, which differ between processes, so the dict
+        # is built again when unpickling. The solver is cheap to build again as well.
+        state = dict(self.__dict__)
+        del state['_ids']
+        state['_solver'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._ids = {symbol: i for i, symbol in enumerate(self._symbols)}
+
+    def _literal(self, symbol):
+        """
+        :return: The integer literal of a symbol or negated symbol: 2i for the symbol with id i in
+            this KB, and 2i + 1 for its negation. None if the symbol does not occur in the KB.
+        """
+        if isinstance(symbol, _NegBoolean):
+            index = self._ids.get(~ symbol)
+            return None if index is None else 2 * index + 1
 
-                    if (not check_theory) or is_feasible(sat_model):
-                        yield sat_model
-                else:
-                    fringe.extend(head.children())
+        index = self._ids.get(symbol)
+        return None if index is None else 2 * index
+
+    def _theory_feasible(self, literals, constraints=frozenset()):
+        """
+        Checks whether the constraints assigned by the given literals, together with the given
+        (constraint, value) pairs, have a solution. Results are cached, so each set of active
+        constraints is only solved once. The cache is emptied when it holds _feasible_limit
+        results, so a KB that is queried for a long time does not keep them all.
+        :param literals: frozenset of literals of constraint symbols
+        :return:
+        """
+        key = (literals, constraints)
+        if key not in self._feasible:
+            if len(self._feasible) >= _feasible_limit:
+                self._feasible.clear()
+
+            model = dict(constraints)
+            for literal in literals:
+                model[self._symbols[literal >> 1]] = not literal & 1
+
+            self._feasible[key] = is_feasible(model)
+
+        return self._feasible[key]
+
+    def _symbol(self, literal):
+        symbol = self._symbols[literal >> 1]
+        return ~ symbol if literal & 1 else symbol
+
+    def entailed(self, candidates):
+        """
+        Determines which of the given symbols or negated symbols are entailed by the knowledge
+        base, ie. are true in every model. This gives the same answers as testing
+        kb.satisfiable(assumptions=[~c]) for every candidate c, but in a single pass: every model
+        that is found rules out all candidates that are false in it, candidates that follow from
+        unit propagation alone need no search, and each entailed candidate is assumed in the
+        queries for the candidates after it.
+
+        :param candidates: List of symbols or negated symbols
+        :return: A list containing, for each candidate, True if it is entailed
+        """
+        if len(candidates) == 0:
+            return []
+
+        first = self._model([])
+        if first is None: # Everything follows from an inconsistent KB
+            return [True] * len(candidates)
+
+        literals = [self._literal(candidate) for candidate in candidates]
+
+        # Symbols that occur in no clause are free, so they are not entailed
+        result = [False if literal is None else None for literal in literals]
+        known = [i for i, literal in enumerate(literals) if literal is not None]
+
+        def refute(model):
+            for i in known:
+                if result[i] is None and model[self._symbols[literals[i] >> 1]] == bool(literals[i] & 1):
+                    result[i] = False
+
+        refute(first)
+
+        learned = [] # Entailed literals, which are assumed from then on
+        for i in known:
+            if result[i] is not None:
+                continue
+
+            if self.compile().implied(literals[i]):
+                result[i] = True
+                continue
+
+            model = self._model(learned + [literals[i] ^ 1])
+            if model is None:
+                result[i] = True
+                learned.append(literals[i])
+            else:
+                refute(model)
+
+        return result
+
+    def _model(self, literals):
+        """
+        :return: The first model in which the given literals hold, or None if there is none.
+        """
+        models = self._models(literals)
+        try:
+            return next(models, None)
+        finally:
+            models.close()
+
+    def compile(self):
+        """
+        Returns the solver for the current clauses. It is built on first use and reused by every
+        query until another clause is added, so a KB that is loaded once can answer any number
+        of satisfiable(assumptions=...) queries without being rebuilt.
+        :return:
+        """
+        if self._solver is None:
+            self._solver = _Solver(self)
+
+        if self._solver.searching(): # Another generator is still iterating over the models
+            return _Solver(self)
+
+        return self._solver
 
     def __repr__(self):
-        return 'symbols: {}, clauses {}'.format(self._symbols, self._clauses)
+        clauses = [[self._symbol(literal) for literal in clause] for clause in self._clauses]
+        return 'symbols: {}, clauses {}'.format(self._symbols, clauses)
 
-class _Node:
+class _Solver:
     """
-    Node in the KB's search tree.
+    DPLL search over the clauses of a knowledge base.
+
+    The symbol with id i in the KB is represented by the integer literals 2i (true) and 2i + 1
+    (false), so a literal is negated with lit ^ 1. Every clause watches its first two
+    literals and is only visited when one of those becomes false. Assignments are pushed
+    onto a trail and undone by popping it, so nothing is copied when the search branches.
     """
-    __assignments = {}
-    __clauses = []
-    __kb = None
-    __consistent = True
 
     def __init__(self,
                  kb # type: KB
             ):
-        """
-        Creates a root node for the given knowledge base
-        :param kb:
-        """
-        self.__kb = kb
+        self.__symbols = list(kb._symbols)
+        self.__theory = [isinstance(symbol, Constraint) for symbol in self.__symbols]
+        n = len(self.__symbols)
+
+        self.__true = [False] * (2 * n) # The literals that are currently assigned true
+        self.__trail = []
+        self.__head = 0 # Trail position up to which unit propagation has been done
+        self.__watches = [[] for _ in range(2 * n)]
+        self.__clauses = []
+        self.__consistent = True
+        self.__searching = False
+
+        units = []
+        for literals in kb._clauses:
+            clause = []
+            for literal in literals:
+                if literal ^ 1 in clause: # Tautologies never constrain the search
+                    clause = None
+                    break
+                if literal not in clause:
+                    clause.append(literal)
+
+            if clause is None:
+                continue
+            if len(clause) == 0:
+                self.__consistent = False
+            elif len(clause) == 1:
+                units.append(clause[0])
+            else:
+                self.__watches[clause[0]].append(len(self.__clauses))
+                self.__watches[clause[1]].append(len(self.__clauses))
+                self.__clauses.append(clause)
+
+        for literal in units:
+            if self.__true[literal ^ 1]:
+                self.__consistent = False
+            elif not self.__true[literal]:
+                self.__assign(literal)
 
-        self.__clauses = list(kb._clauses)
+        if self.__consistent:
+            self.__consistent = self.__propagate()
+        self.__root = len(self.__trail)
 
-    def child(self, symbol, value):
-        # type: (Symbol, bool) -> _Node
+    def implied(self, literal):
         """
-        Return the node reached by setting the given symbol to the given value
+        :return: True if the literal follows from the clauses by unit propagation alone
         """
+        return not self.__searching and self.__true[literal]
 
-        # Copy the node
-        child = _Node(self.__kb)
-        child.__assignments = dict(self.__assignments)
-        child.__clauses = list(self.__clauses)
+    def searching(self):
+        return self.__searching
 
-        # Perform unit propagation
-        nw_assignments = {symbol: value}
-        while len(nw_assignments) > 0:
-            nw_symbol, nw_value = nw_assignments.popitem()
+    def __assign(self, literal):
+        self.__true[literal] = True
+        self.__trail.append(literal)
 
-            # Move the unit clause to the assignments
-            child.__assignments[nw_symbol] = nw_value
+    def __undo(self, mark):
+        """
+        Unassigns everything that was put on the trail after the given position.
+        """
+        while len(self.__trail) > mark:
+            self.__true[self.__trail.pop()] = False
+        self.__head = mark
 
-            # Rewrite the knowledge base with the new information
-            for index in child.__kb._pos_occurrences[nw_symbol]:
-                if nw_value:
-                    child.__clauses[index] = None # Remove the clause
-                else:
-                    # Remove the symbol from the clause
-                    if child.__clauses[index] is not None: # Clause was already removed earlier
-
-                        clause = list(child.__clauses[index])
-                        clause.remove(nw_symbol)
-
-                        if len(clause) == 0: # Empty clauses indicates inconsistency
-                            child.__consistent = False
-                            return child
-
-                        if len(clause) == 1: # New unit clause created
-                            s = clause[0]
-                            if isinstance(s, _NegBoolean):
-                                nw_assignments[~ s] = False
-                            else:
-                                nw_assignments[s] = True
-                            child.__clauses[index] = None
-
-                        child.__clauses[index] = clause
-
-            for index in self.__kb._neg_occurrences[nw_symbol]:
-                if nw_value:
-                    # Remove the symbol from the clause
-                    if child.__clauses[index] is not None: # Clause was already removed earlier
-
-                        clause = list(child.__clauses[index])
-                        clause.remove(~ nw_symbol)
-
-                        if len(clause) == 0: # Empty clauses indicates inconsistency
-                            child.__consistent = False
-                            return child
-
-                        if len(clause) == 1: # New unit clause created
-                            s = clause[0]
-                            if isinstance(s, _NegBoolean):
-                                nw_assignments[~ s] = False
-                            else:
-                                nw_assignments[s] = True
-                            child.__clauses[index] = None
-
-                        child.__clauses[index] = clause
-                else:
-                    child.__clauses[index] = None # Remove the clause
+    def __propagate(self):
+        """
+        Performs unit propagation on the unprocessed part of the trail.
 
-        return child
+        :return: False if a clause became empty
+        """
+        true = self.__true
+        trail = self.__trail
+
+        while self.__head < len(trail):
+            false = trail[self.__head] ^ 1
+            self.__head += 1
+
+            watchers = self.__watches[false]
+            i = 0
+            while i < len(watchers):
+                clause = self.__clauses[watchers[i]]
+
+                # Keep the falsified watch in the second position
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], false
+                other = clause[0]
+
+                if true[other]:
+                    i += 1
+                    continue
+
+                # Look for a literal that is not false to watch instead
+                for k in range(2, len(clause)):
+                    literal = clause[k]
+                    if not true[literal ^ 1]:
+                        clause[1], clause[k] = literal, false
+                        self.__watches[literal].append(watchers[i])
+                        watchers[i] = watchers[-1]
+                        watchers.pop()
+                        break
+                else:
+                    if true[other ^ 1]: # All literals are false
+                        return False
 
-    def children(self):
-        if not self.consistent():
-            return []
+                    self.__assign(other) # The clause has become a unit clause
+                    i += 1
 
-        next_symbol = next(self.free(), None)
-        if not next_symbol:
-            return []
+        return True
 
-        return self.child(next_symbol, True), self.child(next_symbol, False)
+    def __check(self, feasible, mark=None):
+        """
+        Asks the theory whether the constraints on the trail can hold together. If a trail
+        position is given, this is only done when a constraint symbol was assigned after it.
+        """
+        if feasible is None:
+            return True
 
-    def free(self):
-        for symbol in self.__kb._symbols:
-            if symbol not in self.__assignments:
-                yield symbol
+        theory = self.__theory
+        trail = self.__trail
+        if mark is not None and all(not theory[trail[i] >> 1] for i in range(mark, len(trail))):
+            return True
 
-    def consistent(self):
-        return self.__consistent
+        return feasible(frozenset(literal for literal in trail if theory[literal >> 1]))
 
-    def finished(self):
+    def models(self, assumptions=(), feasible=None):
         """
-        :return: True if the current node represents a complete model, with all symbols
-        assigned definite values.
+        Generator for the complete assignments that satisfy the clauses and the assumed literals.
+        Free symbols are branched on in the order in which they were added to the KB, False
+        before True. The solver is back in its initial state once the generator is exhausted or
+        closed.
+
+        :param feasible: Optional function that is given the frozenset of literals of the
+            constraint symbols assigned so far, and returns False if these constraints can not
+            hold together. Such a branch is abandoned as if a clause had become empty.
         """
-        return len(self.__kb._symbols) == len(self.__assignments.keys())
+        if not self.__consistent:
+            return
 
-    def model(self):
-        if not self.finished():
-            return None
-        else:
-            return self.__assignments
+        true = self.__true
+        n = len(self.__symbols)
+
+        decisions = [] # Trail position, symbol, and whether the True branch is taken
+        var = 0
+
+        self.__searching = True
+        try:
+            for literal in assumptions:
+                if true[literal ^ 1]:
+                    return
+                if not true[literal]:
+                    self.__assign(literal)
+
+            if not (self.__propagate() and self.__check(feasible)):
+                return
+
+            while True:
+                while var < n and (true[2 * var] or true[2 * var + 1]):
+                    var += 1
+
+                if var == n:
+                    yield {symbol: true[2 * i] for i, symbol in enumerate(self.__symbols)}
+                    consistent = False
+                else:
+                    decisions.append([len(self.__trail), var, False])
+                    self.__assign(2 * var + 1)
+                    consistent = self.__propagate() and self.__check(feasible, decisions[-1][0])
+
+                while not consistent:
+                    # Backtrack to the last decision with an unexplored True branch
+                    while len(decisions) > 0 and decisions[-1][2]:
+                        decisions.pop()
+                    if len(decisions) == 0:
+                        return
+
+                    decision = decisions[-1]
+                    decision[2] = True
+                    self.__undo(decision[0])
+                    self.__assign(2 * decision[1])
+                    consistent = self.__propagate() and self.__check(feasible, decision[0])
+
+                var = decisions[-1][1] + 1 if len(decisions) > 0 else 0
+        finally:
+            self.__undo(self.__root)
+            self.__searching = False
 
     def __repr__(self):
-        return str(self.__assignments) + (' finished' if self.finished() else ' incomplete') \
-               + ' ' + (' consistent' if self.consistent() else ' inconsistent') \
-               + ', clauses:' + str(self.__clauses)
+        return 'trail: {}, clauses: {}'.format(self.__trail, self.__clauses)
 
 def optimize(*constraints):
     """
@@ -621,6 +888,7 @@ def optimize(*constraints):
     # Gather all symbols
     symbols = union(*[c.symbols() for c in constraints])
     symbols = [s.name() for s in symbols]
+    index = {name: j for j, name in enumerate(symbols)}
     n = len(symbols)
 
     # Canonicalize the constraints, and sort by equalities ad inequalities
@@ -652,7 +920,7 @@ def optimize(*constraints):
             if not isinstance(term, Constant):
                 name = term.name()
                 mult = term.mult()
-                j = symbols.index(name)
+                j = index[name]
 
                 A_ub[i, j] += mult
             else:
@@ -665,7 +933,7 @@ def optimize(*constraints):
             if not isinstance(term, Constant):
                 symbol = term.name()
                 mult = term.mult()
-                j = symbols.index(symbol)
+                j = index[symbol]
 
                 A_eq[i, j] += mult
             else:
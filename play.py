@@ -15,10 +15,10 @@ from api import State, engine, util
 def call_engine(options):
 
     # Create player 1
-    player1 = util.load_player(options.player1)
+    player1 = engine.Worker(util.load_player(options.player1))
 
     # Create player 2
-    player2 = util.load_player(options.player2)
+    player2 = engine.Worker(util.load_player(options.player2))
 
     # Generate or load the map
     state = State.generate(phase=int(options.phase))
@@ -31,6 +31,9 @@ def call_engine(options):
 
     engine.play(player1, player2, state=state, max_time=options.max_time*1000, verbose=(not options.quiet))
 
+    player1.stop()
+    player2.stop()
+
 if __name__ == "__main__":
 
     ## Parse the command line options
@@ -0,0 +1,26 @@
+from unittest import TestCase
+
+from api import State
+from bots.alphabeta.alphabeta import Bot
+
+
+class TestAlphabeta(TestCase):
+
+	def test_transposition_table_keeps_values(self):
+		for id in range(20):
+			state = State.generate(id, phase=2)
+
+			for depth in (-1, 4):
+				value, _ = Bot(randomize=False, depth=depth, table_size=0).value(state.clone())
+				table_value, _ = Bot(randomize=False, depth=depth, table_size=2**16).value(state.clone())
+
+				self.assertEqual(value, table_value)
+
+	def test_table_shared_between_moves(self):
+		state = State.generate(3, phase=2)
+		bot = Bot(depth=-1, table_size=64)
+
+		while not state.finished():
+			move = bot.get_move(state)
+			self.assertIn(move, state.moves())
+			state = state.next(move)
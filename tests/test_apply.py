@@ -0,0 +1,81 @@
+from unittest import TestCase
+
+from api import State
+import random
+
+
+class TestApply(TestCase):
+
+	def test_apply_matches_next(self):
+		for id in range(50):
+			rng = random.Random(id)
+			state = State.generate(id, phase=1 if id % 2 == 0 else 2)
+			applied = state.clone()
+
+			while not state.finished():
+				move = rng.choice(state.moves())
+				state = state.next(move)
+				applied.apply(move)
+
+				self.assertEqual(state, applied)
+				self.assertEqual(state.get_perspective(1), applied.get_perspective(1))
+				self.assertEqual(state.get_perspective(2), applied.get_perspective(2))
+				self.assertEqual(state.get_prev_trick(), applied.get_prev_trick())
+
+	def test_undo_restores_state(self):
+		for id in range(50):
+			rng = random.Random(id)
+			start = State.generate(id)
+			state = start.clone()
+			visited = [state.clone()]
+
+			while not state.finished():
+				state.apply(rng.choice(state.moves()))
+				visited.append(state.clone())
+
+			visited.pop()
+			while len(visited) > 0:
+				state.undo()
+				expected = visited.pop()
+				self.assertEqual(state, expected)
+				self.assertEqual(state.moves(), expected.moves())
+				self.assertEqual(state.get_prev_trick(), expected.get_prev_trick())
+
+			self.assertEqual(state, start)
+			self.assertRaises(RuntimeError, state.undo)
+
+	def test_apply_invalid_move(self):
+		state = State.generate(0)
+		player = state.whose_turn()
+		card = [index for index in range(20) if index not in state.hand()][0]
+
+		state.apply((card, None))
+		self.assertEqual(state.revoked(), player)
+
+		state.undo()
+		self.assertEqual(state, State.generate(0))
+
+	def test_apply_signed_state(self):
+		state = State.generate(0)
+		signed = state.clone(signature=state.whose_turn())
+		signed.apply(signed.moves()[0])
+
+		self.assertRaises(RuntimeError, signed.apply, (0, None))
+
+	def test_playout_matches_next(self):
+		for id in range(30):
+			start = State.generate(id, phase=1 if id % 2 == 0 else 2)
+
+			for depth in (0, 5, None):
+				rng = random.Random(id)
+				state = start
+
+				played = 0
+				while not state.finished() and (depth is None or played < depth):
+					state = state.next(rng.choice(state.moves()))
+					played += 1
+
+				self.assertEqual(start.playout(depth, random.Random(id)), state)
+
+			self.assertTrue(start.playout().finished())
+			self.assertEqual(start, State.generate(id, phase=1 if id % 2 == 0 else 2))
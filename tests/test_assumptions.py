@@ -0,0 +1,71 @@
+from unittest import TestCase
+
+from api import State, util
+import json, math, random
+
+
+class TestAssumptions(TestCase):
+
+	def signed_states(self):
+		states = []
+
+		for id in range(10):
+			rng = random.Random(id)
+			state = State.generate(id)
+
+			while state.get_phase() == 1 and not state.finished():
+				states.append(state.clone(signature=state.whose_turn()))
+				state = state.next(rng.choice(state.moves()))
+
+		return states
+
+	def test_batch_matches_single_assumption(self):
+		for state in self.signed_states():
+			random.seed(5)
+			single = state.make_assumption()
+			batch = state.make_assumptions(3, seed=random.Random(5).randint(0, 100000))
+
+			self.assertEqual(len(batch), 3)
+			self.assertEqual(batch[0], single)
+
+	def test_assumptions_are_consistent(self):
+		for state in self.signed_states():
+			player = state.whose_turn()
+			known = [(index, card) for index, card in enumerate(state.get_perspective()) if card != 'U']
+
+			for assumption in state.make_assumptions(4):
+				loaded = State.load_from_json(json.loads(assumption.convert_to_json()))
+				self.assertEqual(hash(assumption), hash(loaded))
+				self.assertEqual(assumption.get_hash(player), state.get_hash(player))
+
+				perspective = assumption.get_perspective()
+				self.assertNotIn('U', perspective)
+				for index, card in known:
+					self.assertEqual(perspective[index], card)
+
+	def test_distinct_assumptions(self):
+		for state in self.signed_states():
+			perspective = state.get_perspective()
+			unknowns = perspective.count('U')
+			opponent_unknowns = 5 - perspective.count('P{}H'.format(util.other(state.whose_turn())))
+			deals = math.factorial(unknowns) // (math.factorial(opponent_unknowns) * math.factorial(unknowns - opponent_unknowns)) * math.factorial(unknowns - opponent_unknowns)
+
+			assumptions = state.make_assumptions(50, distinct=True)
+
+			self.assertEqual(len(assumptions), min(50, deals))
+			self.assertEqual(len(set(hash(assumption) for assumption in assumptions)), len(assumptions))
+
+	def test_perfect_information_raises(self):
+		self.assertRaises(RuntimeError, State.generate(0).make_assumptions, 2)
+
+	def test_enumerate_all_deals(self):
+		for state in self.signed_states():
+			deals = state.count_deals()
+			assumptions = state.enumerate_assumptions(threshold=200, n=30)
+
+			if deals <= 200:
+				self.assertEqual(len(assumptions), deals)
+				self.assertEqual(len(set(hash(assumption) for assumption, _ in assumptions)), deals)
+				self.assertTrue(all(count == 1 for _, count in assumptions))
+			else:
+				self.assertEqual(sum(count for _, count in assumptions), 30)
@@ -0,0 +1,35 @@
+from unittest import TestCase
+
+from api import State
+import json, os, random
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'data', 'baseline_games.json')
+
+
+class TestBaseline(TestCase):
+
+	def test_matches_list_based_deck(self):
+		# data/baseline_games.json was recorded with the list-based deck that preceded the
+		# bitmask one: seeded random games, and for every state the perspectives, the moves
+		# (also for the player to move's signed view) and the points
+		with open(BASELINE) as file:
+			games = json.load(file)
+
+		for game in games:
+			seed = game['seed']
+			rng = random.Random(seed)
+			state = State.generate(seed, phase=1 if seed % 3 else 2)
+
+			for expected in game['steps']:
+				signed = state.clone(signature=state.whose_turn()) if state.get_phase() == 1 else state
+				moves = state.moves()
+				actual = [
+					state.get_perspective(), state.get_perspective(1), state.get_perspective(2),
+					signed.get_perspective(), [list(move) for move in moves], [list(move) for move in signed.moves()],
+					[state.get_points(1), state.get_points(2), state.get_pending_points(1), state.get_pending_points(2)]]
+
+				self.assertEqual(actual, expected)
+				state = state.next(rng.choice(moves))
+
+			self.assertTrue(state.finished())
+			self.assertEqual(list(state.winner()), game['winner'])
@@ -0,0 +1,37 @@
+from unittest import TestCase
+
+from api import State, engine
+from bots.rand.rand import Bot as RandBot
+import random, time
+
+
+class SlowBot:
+
+	def get_move(self, state):
+		time.sleep(1)
+		return state.moves()[0]
+
+
+class TestEngine(TestCase):
+
+	def test_worker_plays_like_new_processes(self):
+		for id in range(3):
+			random.seed(id)
+			expected = engine.play(RandBot(), RandBot(), State.generate(id), 5000, verbose=False)
+
+			player1, player2 = engine.Worker(RandBot()), engine.Worker(RandBot())
+			random.seed(id)
+			result = engine.play(player1, player2, State.generate(id), 5000, verbose=False)
+			player1.stop()
+			player2.stop()
+
+			self.assertEqual(expected, result)
+
+	def test_worker_restarts_after_timeout(self):
+		worker = engine.Worker(SlowBot())
+		state = State.generate(0)
+		state = state.clone(signature=state.whose_turn())
+
+		self.assertEqual(worker.get_move(state, 100), "Late")
+		self.assertEqual(worker.get_move(state, 5000), state.moves()[0])
+		worker.stop()
@@ -0,0 +1,77 @@
+from unittest import TestCase
+
+from api import Deck, State
+import json, random
+
+
+class TestHash(TestCase):
+
+	def test_incremental_hash(self):
+		# The incrementally updated hashes should match hashes computed from scratch
+		for id in range(50):
+			rng = random.Random(id)
+			state = State.generate(id)
+
+			while not state.finished():
+				state = state.next(rng.choice(state.moves()))
+				loaded = State.load_from_json(json.loads(state.convert_to_json()))
+
+				self.assertEqual(state, loaded)
+				self.assertEqual(hash(state), hash(loaded))
+				self.assertEqual(state.get_hash(1), loaded.get_hash(1))
+				self.assertEqual(state.get_hash(2), loaded.get_hash(2))
+
+	def test_clone_hash(self):
+		state = State.generate(0)
+		self.assertEqual(hash(state), hash(state.clone()))
+		self.assertEqual(hash(State.generate(0)), hash(state))
+		self.assertNotEqual(hash(State.generate(1)), hash(state))
+
+	def test_apply_undo_hash(self):
+		state = State.generate(3, phase=2)
+		start = hash(state)
+
+		for move in state.moves():
+			state.apply(move)
+			self.assertEqual(hash(state), hash(state.clone()))
+			self.assertNotEqual(hash(state), start)
+			state.undo()
+			self.assertEqual(hash(state), start)
+
+	def test_transposition(self):
+		# Playing the same tricks in a different order leads to the same state, with the same hash
+		state = State.generate(5, phase=2)
+		seen = {}
+		transpositions = 0
+
+		for first in state.moves():
+			one = state.next(first)
+			for second in one.moves():
+				two = one.next(second)
+				if two.finished():
+					continue
+
+				for third in two.moves():
+					three = two.next(third)
+					for fourth in three.moves():
+						four = three.next(fourth)
+						if hash(four) in seen:
+							self.assertEqual(seen[hash(four)], four)
+							transpositions += 1
+						seen[hash(four)] = four
+
+		self.assertGreater(transpositions, 0)
+
+	def test_signed_hash(self):
+		# A signed state's hash only depends on what the signing player knows
+		state = State.generate(7)
+		me = state.whose_turn()
+		signed = state.clone(signature=me)
+
+		self.assertEqual(hash(signed), state.get_hash(me))
+
+		for _ in range(10):
+			assumed = signed.make_assumption()
+			self.assertEqual(hash(signed), assumed.get_hash(me))
+			self.assertEqual(hash(signed), assumed.clone(signature=me).get_hash())
+			self.assertNotEqual(hash(signed), hash(assumed))
@@ -0,0 +1,186 @@
+from unittest import TestCase, mock
+import itertools, pickle, random, subprocess, sys
+
+from bots.kbbot import load
+from bots.kbbot.kbbot import Bot
+from bots.kbbot import kb as kbmodule
+from bots.kbbot.kb import KB, Boolean, Integer, is_feasible
+
+
+def random_kb(rng, n, m):
+	symbols = [Boolean('s' + str(i)) for i in range(n)]
+	kb = KB()
+	for _ in range(m):
+		clause = [rng.choice(symbols) for _ in range(rng.randint(1, 3))]
+		kb.add_clause(*[s if rng.random() < 0.5 else ~s for s in clause])
+	return kb
+
+
+def brute_force(kb):
+	"""All assignments satisfying the clauses of kb, in the order of the tree search."""
+	models = []
+	for values in itertools.product([False, True], repeat=len(kb._symbols)):
+		model = dict(zip(kb._symbols, values))
+		if all(any(values[l >> 1] != l & 1 for l in clause) for clause in kb._clauses):
+			models.append(model)
+	return models
+
+
+class TestKB(TestCase):
+
+	def test_models_match_brute_force(self):
+		rng = random.Random(0)
+
+		for _ in range(200):
+			kb = random_kb(rng, rng.randint(1, 7), rng.randint(1, 12))
+			expected = brute_force(kb)
+
+			self.assertEqual(list(kb.models()), expected)
+			self.assertEqual(kb.satisfiable(), len(expected) > 0)
+
+	def test_assumptions(self):
+		rng = random.Random(1)
+
+		for _ in range(200):
+			kb = random_kb(rng, rng.randint(1, 7), rng.randint(1, 12))
+			models = list(kb.models())
+			candidates = kb._symbols + [Boolean('unused')]
+			assumptions = [s if rng.random() < 0.5 else ~s for s in rng.sample(candidates, rng.randint(1, min(3, len(candidates))))]
+
+			expected = KB()
+			for clause in kb._clauses:
+				expected.add_clause(*[kb._symbol(l) for l in clause])
+			for assumption in assumptions:
+				expected.add_clause(assumption)
+
+			self.assertEqual(kb.satisfiable(assumptions=assumptions), expected.satisfiable())
+			self.assertEqual(list(kb.models()), models)
+
+	def test_interned_symbols(self):
+		a, b = Boolean('a'), Boolean('b')
+
+		self.assertEqual(a, Boolean('a'))
+		self.assertEqual(~a, ~Boolean('a'))
+		self.assertNotEqual(a, ~a)
+		self.assertNotEqual(a, b)
+		self.assertEqual(len({a, Boolean('a'), ~a, ~Boolean('a'), b}), 3)
+
+		kb = KB()
+		kb.add_clause(a, ~b)
+		kb.add_clause(~Boolean('a'), Boolean('b'))
+
+		self.assertEqual(kb._symbols, [a, b])
+		self.assertEqual([list(c) for c in kb._clauses], [[0, 3], [1, 2]])
+
+	def test_intern_table_drops_unused_names(self):
+		symbols = [Boolean('temporary' + str(i)) for i in range(10)]
+		kb = KB()
+		kb.add_clause(*symbols)
+		self.assertIn('temporary0', kbmodule._names)
+
+		del symbols, kb
+		self.assertNotIn('temporary0', kbmodule._names)
+
+		a, b = Boolean('temporary0'), Boolean('temporary0')
+		self.assertEqual(a, b)
+		self.assertEqual(hash(a), hash(b))
+
+	def test_entailed(self):
+		rng = random.Random(3)
+
+		for _ in range(200):
+			kb = random_kb(rng, rng.randint(1, 7), rng.randint(1, 12))
+			candidates = [s if rng.random() < 0.5 else ~s for s in kb._symbols + [Boolean('unused')]]
+			rng.shuffle(candidates)
+
+			expected = [not kb.satisfiable(assumptions=[~c]) for c in candidates]
+			self.assertEqual(kb.entailed(candidates), expected)
+
+		x = Integer('x')
+		kb = KB()
+		kb.add_clause(x > 5)
+		kb.add_clause(x < 3, Boolean('a'))
+		self.assertEqual(kb.entailed([Boolean('a'), ~Boolean('a')]), [True, False])
+
+	def test_strategy_entailment(self):
+		for index in range(20):
+			kb = KB()
+			load.general_information(kb)
+			load.strategy_knowledge(kb)
+			kb.add_clause(~Boolean('pj' + str(index)))
+
+			self.assertEqual(kb.satisfiable(), index % 5 != 4)
+
+		bot = Bot()
+		for index in range(20):
+			self.assertEqual(bot.kb_consistent(None, (index, None)), index % 5 != 4)
+
+		moves = [(index, None) for index in range(20)]
+		self.assertEqual(bot.kb.entailed([bot.strategy_variable(m) for m in moves]), [i % 5 == 4 for i in range(20)])
+
+	def test_theory(self):
+		x, y = Integer('x'), Integer('y')
+		kb = KB()
+		kb.add_clause(x + y == 10)
+		kb.add_clause(x > 8, y > 8)
+		kb.add_clause(x < 0)
+
+		self.assertTrue(kb.satisfiable())
+
+		kb.add_clause(y < 0)
+		self.assertFalse(kb.satisfiable())
+		self.assertEqual(len(list(kb.models(check_theory=False))), 3)
+
+	def test_theory_checked_during_search(self):
+		rng = random.Random(2)
+		x, y = Integer('x'), Integer('y')
+
+		for _ in range(20):
+			symbols = [Boolean('b' + str(i)) for i in range(3)]
+			symbols += [x + y > rng.randint(-5, 5), x < rng.randint(-5, 5), y < rng.randint(-5, 5)]
+
+			kb = KB()
+			for _ in range(rng.randint(1, 8)):
+				clause = rng.sample(symbols, rng.randint(1, 3))
+				kb.add_clause(*[s if rng.random() < 0.5 or not isinstance(s, Boolean) else ~s for s in clause])
+
+			expected = [m for m in kb.models(check_theory=False) if is_feasible(m)]
+			self.assertEqual(list(kb.models()), expected)
+
+			# Every set of active constraints was solved once, so queries no longer run the LP
+			with mock.patch.object(kbmodule, 'optimize', wraps=kbmodule.optimize) as optimize:
+				self.assertEqual(list(kb.models()), expected)
+				self.assertEqual(optimize.call_count, 0)
+
+	def test_theory_cache_bounded(self):
+		x, y = Integer('x'), Integer('y')
+		kb = KB()
+		for i in range(-2, 2):
+			kb.add_clause(x + y > i, x < i)
+
+		expected = [m for m in kb.models(check_theory=False) if is_feasible(m)]
+		with mock.patch.object(kbmodule, '_feasible_limit', 4):
+			self.assertEqual(list(kb.models()), expected)
+			self.assertLessEqual(len(kb._feasible), 4)
+
+	def test_pickle_in_new_process(self):
+		bot = Bot()
+		moves = [(index, None) for index in range(20)]
+		expected = bot.kb.entailed([bot.strategy_variable(m) for m in moves])
+
+		# The new process interns other names first, so the symbols get different ids there
+		script = """if True:
+			import pickle, sys
+			from bots.kbbot.kb import Boolean
+			[Boolean('other' + str(i)) for i in range(50)]
+
+			bot, symbol, negation = pickle.loads(sys.stdin.buffer.read())
+			moves = [(index, None) for index in range(20)]
+			print(bot.kb.entailed([bot.strategy_variable(m) for m in moves]))
+			print(symbol == Boolean('pj4'), negation == ~Boolean('pj4'), hash(symbol) == hash(Boolean('pj4')))
+		"""
+		data = pickle.dumps((bot, Boolean('pj4'), ~Boolean('pj4')))
+		result = subprocess.run([sys.executable, '-c', script], input=data, capture_output=True, timeout=60)
+
+		self.assertEqual(result.returncode, 0, result.stderr)
+		self.assertEqual(result.stdout.decode().split('\n')[:2], [str(expected), 'True True True'])
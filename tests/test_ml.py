@@ -0,0 +1,176 @@
+from unittest import TestCase
+
+from api import State
+from bots.ml.ml import Bot, exported_model, features, feature_matrix, FEATURE_LENGTH, FEATURE_LAYOUT, OFFSETS
+from bots.ml import dataset, network
+import numpy as np
+import importlib.util, random, sys, tempfile, os
+
+
+class TestFeatures(TestCase):
+
+	def states(self):
+		states = []
+
+		for id in range(10):
+			rng = random.Random(id)
+			state = State.generate(id, phase=1 if id % 2 == 0 else 2)
+
+			while not state.finished():
+				states.append(state.clone(signature=state.whose_turn()) if state.get_phase() == 1 else state)
+				state = state.next(rng.choice(state.moves()))
+
+		return states
+
+	def test_one_hot_encodings(self):
+		for state in self.states():
+			row = features(state)
+
+			self.assertEqual(len(row), FEATURE_LENGTH)
+			self.assertEqual(row[0], state.get_points(1))
+			self.assertEqual(row[7], state.whose_turn())
+			self.assertEqual(row[OFFSETS['perspective_onehot']:OFFSETS['normalized_points']].sum(), 20)
+			self.assertEqual(row[OFFSETS['trump_suit_onehot']:OFFSETS['phase_onehot']].sum(), 1)
+			self.assertEqual(row[OFFSETS['opponents_played_card_onehot']:].sum(), 1)
+
+	def test_layout_covers_vector(self):
+		end = 0
+		for name, start, length in FEATURE_LAYOUT:
+			self.assertEqual(start, end, name)
+			end = start + length
+
+		self.assertEqual(end, FEATURE_LENGTH)
+
+	def test_matrix_matches_rows(self):
+		states = self.states()
+		matrix = feature_matrix(states)
+
+		for row, state in zip(matrix, states):
+			self.assertEqual(row.tobytes(), features(state).tobytes())
+
+	def test_reused_row_is_cleared(self):
+		states = self.states()
+		row = features(states[0])
+
+		self.assertEqual(features(states[-1], row).tobytes(), features(states[-1]).tobytes())
+
+
+class TestDataset(TestCase):
+
+	def test_append_and_load(self):
+		with tempfile.TemporaryDirectory() as path:
+			dataset.create(path)
+			first = np.random.rand(3, FEATURE_LENGTH)
+			second = np.random.rand(2, FEATURE_LENGTH)
+
+			dataset.append(path, first, [dataset.WON, dataset.LOST, dataset.WON])
+			dataset.append(path, second, [dataset.LOST, dataset.LOST])
+			data, target = dataset.load(path)
+
+			self.assertEqual(data.shape, (5, FEATURE_LENGTH))
+			self.assertTrue(np.array_equal(data, np.vstack([first, second]).astype(np.float32)))
+			self.assertEqual(list(target), [1, -1, 1, -1, -1])
+
+	def test_rows_of_interrupted_append_are_ignored(self):
+		with tempfile.TemporaryDirectory() as path:
+			dataset.create(path)
+			dataset.append(path, np.ones((2, FEATURE_LENGTH)), [dataset.WON, dataset.WON])
+
+			# Rows written without updating the metadata
+			with open(os.path.join(path, dataset.FEATURES_FILE), 'ab') as file:
+				file.write(np.zeros(FEATURE_LENGTH, dtype=np.float32).tobytes()[:100])
+
+			self.assertEqual(dataset.load(path)[0].shape, (2, FEATURE_LENGTH))
+
+			dataset.append(path, np.zeros((1, FEATURE_LENGTH)), [dataset.LOST])
+			data, target = dataset.load(path)
+
+			self.assertEqual(data.sum(), 2 * FEATURE_LENGTH)
+			self.assertEqual(list(target), [1, 1, -1])
+
+
+	def test_parallel_creation_is_reproducible(self):
+		path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'train-ml-bot.py')
+		spec = importlib.util.spec_from_file_location('train_ml_bot', path)
+		train = importlib.util.module_from_spec(spec)
+		sys.modules[spec.name] = train # So that the pool can find its functions
+		spec.loader.exec_module(train)
+
+		with tempfile.TemporaryDirectory() as directory:
+			contents = []
+
+			for jobs in (1, 3):
+				path = os.path.join(directory, str(jobs))
+				train.create_dataset(path, games=25, jobs=jobs, seed=5)
+
+				contents.append([open(os.path.join(path, name), 'rb').read() for name in (dataset.FEATURES_FILE, dataset.LABELS_FILE)])
+
+			self.assertGreater(len(contents[0][1]), 0)
+			self.assertEqual(contents[0], contents[1])
+
+class TestNetwork(TestCase):
+
+	def test_matches_classifier(self):
+		from sklearn.neural_network import MLPClassifier
+
+		rng = np.random.default_rng(0)
+		data = rng.random((200, FEATURE_LENGTH))
+
+		for activation in ('relu', 'tanh', 'logistic'):
+			for target in (rng.choice(['won', 'lost'], 200), rng.choice([-1, 0, 1], 200)):
+				model = MLPClassifier((8, 4), activation=activation, max_iter=20).fit(data, target)
+
+				with tempfile.TemporaryDirectory() as path:
+					network.export(model, os.path.join(path, 'model.npz'))
+					loaded = network.Network(os.path.join(path, 'model.npz'))
+
+				self.assertEqual(list(loaded.classes_), list(model.classes_))
+				self.assertTrue(np.allclose(loaded.predict_proba(data), model.predict_proba(data)))
+
+
+class TestBot(TestCase):
+
+	def test_batch_matches_single_predictions(self):
+		from sklearn.neural_network import MLPClassifier
+		import joblib
+
+		states = TestFeatures().states()
+		data = feature_matrix(states)
+		rng = np.random.default_rng(0)
+
+		for won, lost in (('won', 'lost'), (1, -1)):
+			target = [won if x else lost for x in rng.integers(0, 2, len(states))]
+			model = MLPClassifier((8,), max_iter=50).fit(data, target)
+			classes = list(model.classes_)
+
+			expected = []
+			for state in states:
+				probs = model.predict_proba(features(state).reshape(1, -1))[0]
+				expected.append(probs[classes.index(won)] - probs[classes.index(lost)])
+
+			with tempfile.TemporaryDirectory() as path:
+				joblib.dump(model, os.path.join(path, 'model.pkl'))
+				network.export(model, os.path.join(path, 'model.npz'))
+
+				for model_file in ('model.pkl', 'model.npz'):
+					bot = Bot(randomize=False, model_file=os.path.join(path, model_file))
+
+					self.assertTrue(np.allclose(bot.heuristics(states), expected))
+					self.assertTrue(np.isclose(bot.heuristic(states[0]), expected[0]))
+					self.assertIn(bot.get_move(states[0]), states[0].moves())
+
+	def test_stale_export_is_not_used(self):
+		with tempfile.TemporaryDirectory() as path:
+			model, exported = os.path.join(path, 'model.pkl'), os.path.join(path, 'model.npz')
+
+			open(model, 'w').close()
+			self.assertEqual(exported_model(model), model)
+
+			open(exported, 'w').close()
+			os.utime(model, (1000, 1000))
+			os.utime(exported, (2000, 2000))
+			self.assertEqual(exported_model(model), exported)
+
+			# The model was trained again after the export
+			os.utime(model, (3000, 3000))
+			self.assertEqual(exported_model(model), model)
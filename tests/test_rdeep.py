@@ -0,0 +1,50 @@
+from unittest import TestCase
+
+from api import State, engine
+from bots.rdeep.rdeep import Bot
+import random, time
+
+
+class TestRdeep(TestCase):
+
+	def test_anytime_keeps_budget(self):
+		state = State.generate(0)
+		state = state.clone(signature=state.whose_turn())
+
+		for max_time in (0, 50, 200):
+			start = time.time()
+			move = Bot(max_time=max_time).get_move(state)
+
+			self.assertIn(move, state.moves())
+			self.assertLess(time.time() - start, max(max_time / 1000.0, 0.01))
+
+	def test_anytime_within_engine_limit(self):
+		state = State.generate(0)
+		state = state.clone(signature=state.whose_turn())
+
+		worker = engine.Worker(Bot(max_time=100))
+		try:
+			worker.get_move(state)
+			for _ in range(5):
+				self.assertIn(worker.get_move(state, 100), state.moves())
+		finally:
+			worker.stop()
+
+	def test_parallel_independent_of_processes(self):
+		state = State.generate(1)
+		state = state.clone(signature=state.whose_turn())
+		moves = []
+
+		for processes in (1, 2, 3):
+			bot = Bot(processes=processes)
+			random.seed(2)
+			moves.append([bot.get_move(state) for _ in range(3)])
+
+		self.assertEqual(moves[0], moves[1])
+		self.assertEqual(moves[0], moves[2])
+
+	def test_parallel_anytime(self):
+		state = State.generate(1)
+		state = state.clone(signature=state.whose_turn())
+
+		self.assertIn(Bot(max_time=100, processes=2).get_move(state), state.moves())
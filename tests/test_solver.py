@@ -0,0 +1,37 @@
+from unittest import TestCase
+
+from api import State, engine
+from api.solver import Solver
+from bots.alphabeta.alphabeta import Bot as AlphabetaBot
+from bots.rand.rand import Bot as RandBot
+from bots.solver.solver import Bot as SolverBot
+
+
+class TestSolver(TestCase):
+
+	def test_matches_full_search(self):
+		solver = Solver()
+
+		for id in range(20):
+			state = State.generate(id, phase=2)
+			value, move = solver.solve(state)
+			expected, _ = AlphabetaBot(randomize=False, depth=-1, table_size=0).value(state.clone())
+
+			self.assertEqual(value, expected)
+			self.assertIn(move, state.moves())
+			self.assertEqual(solver.value(state, 2), -value)
+
+	def test_value_is_kept_by_best_move(self):
+		solver = Solver()
+		state = State.generate(7, phase=2)
+		value, _ = solver.solve(state)
+
+		while not state.finished():
+			state = state.next(solver.best_move(state))
+			self.assertEqual(solver.solve(state)[0], value)
+
+	def test_phase_1_raises(self):
+		self.assertRaises(RuntimeError, Solver().solve, State.generate(0))
+
+	def test_bot_plays_game(self):
+		engine.play(SolverBot(), RandBot(), State.generate(0), verbose=False)
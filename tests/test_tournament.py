@@ -0,0 +1,75 @@
+from unittest import TestCase
+import csv, os, subprocess, sys, tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestTournament(TestCase):
+
+	def tournament(self, *args):
+		return subprocess.run([sys.executable, os.path.join(ROOT, 'tournament.py')] + list(args),
+			cwd=ROOT, capture_output=True, text=True, timeout=60)
+
+	def test_parallel_tournament_exits(self):
+		with tempfile.TemporaryDirectory() as directory:
+			output = os.path.join(directory, 'scores.csv')
+			result = self.tournament('-p', 'rand,bully', '-r', '2', '-j', '2', '--seed', '1', '-t', '1', '-o', output)
+
+			self.assertEqual(result.returncode, 0, result.stderr)
+			with open(output, newline='') as file:
+				self.assertEqual(len(list(csv.reader(file))), 3)
+
+	def test_results_independent_of_jobs(self):
+		rows = []
+
+		with tempfile.TemporaryDirectory() as directory:
+			for jobs in ('1', '3'):
+				output = os.path.join(directory, 'scores{}.csv'.format(jobs))
+				result = self.tournament('-p', 'rand,bully,rdeep', '-r', '3', '-j', jobs, '--seed', '4', '-o', output)
+				self.assertEqual(result.returncode, 0, result.stderr)
+
+				with open(output, newline='') as file:
+					rows.append(sorted(list(csv.reader(file))[1:]))
+
+		self.assertEqual(len(rows[0]), 9)
+		self.assertEqual(rows[0], rows[1])
+
+	def test_resume(self):
+		with tempfile.TemporaryDirectory() as directory:
+			output = os.path.join(directory, 'scores.csv')
+			args = ['-p', 'rand,bully', '-r', '4', '-f', '-o', output]
+
+			result = self.tournament(*args, '--resume')
+			self.assertEqual(result.returncode, 2)
+			self.assertIn('--resume requires --seed', result.stderr)
+			self.assertFalse(os.path.exists(output))
+
+			self.tournament(*args, '--seed', '1')
+			with open(output, newline='') as file:
+				rows = list(csv.reader(file))
+
+			# Interrupt the tournament after two games
+			with open(output, 'w', newline='') as file:
+				csv.writer(file, quoting=csv.QUOTE_ALL).writerows(rows[:3])
+
+			result = self.tournament(*args, '--seed', '1', '--resume')
+			self.assertEqual(result.returncode, 0, result.stderr)
+			self.assertIn('Played 3 out of 4 games', result.stdout)
+
+			with open(output, newline='') as file:
+				resumed = list(csv.reader(file))
+			self.assertEqual(resumed[0], rows[0])
+			self.assertEqual(sorted(resumed[1:]), sorted(rows[1:]))
+
+	def test_resume_other_tournament(self):
+		with tempfile.TemporaryDirectory() as directory:
+			output = os.path.join(directory, 'scores.csv')
+			self.tournament('-p', 'rand,bully', '-r', '2', '-f', '--seed', '1', '-o', output)
+
+			result = self.tournament('-p', 'rdeep,bully', '-r', '2', '-f', '--seed', '1', '--resume', '-o', output)
+			self.assertEqual(result.returncode, 2)
+			self.assertIn('other players', result.stderr)
+
+			result = self.tournament('-p', 'rand,bully', '-r', '2', '-f', '--seed', '2', '--resume', '-o', output)
+			self.assertEqual(result.returncode, 2)
+			self.assertIn('not part of this tournament', result.stderr)
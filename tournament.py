@@ -7,27 +7,68 @@ python play.py -h
 """
 
 from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
 from api import State, util, engine
-import random, time, csv
+from collections import Counter
+import random, time, csv, os
+
+# The bots of the process playing the games, see load_bots()
+bots = None
+
+class ResumeError(Exception):
+    """
+    Raised when the output file to resume from is not of the same tournament.
+    """
+    pass
+
+def load_bots(botnames, fast):
+    """
+    Loads the bots into the process that plays the games. With several jobs,
+    every process of the pool has its own bots.
+    """
+    global bots
+
+    bots = [util.load_player(botname) for botname in botnames]
+
+    # Keep every bot in its own process for the whole tournament, so the time limit
+    # is enforced without starting a process for every move
+    if not fast:
+        bots = [engine.Worker(bot) for bot in bots]
+
+def play_game(game, options):
+    """
+    Plays a single game of the tournament. The global PRNG is seeded with the seed of
+    the game, so every game plays out the same, whichever process plays it.
+
+    :param game: A tuple (p, seed) of the indices of player 1 and 2 and the seed of the game
+    :return: The result of engine.play()
+    """
+    p, seed = game
+
+    random.seed(seed)
+    state = State.generate(id=seed, phase=int(options.phase))
+
+    return engine.play(bots[p[0]], bots[p[1]], state, options.max_time*1000, verbose=options.verbose, fast=options.fast)
 
 def run_tournament(options):
 
     botnames = options.players.split(",")
 
-    bots = []
-    for botname in botnames:
-        bots.append(util.load_player(botname))
-
-    n = len(bots)
-    wins = [0] * len(bots)
+    n = len(botnames)
+    wins = [0] * n
     matches = [(p1, p2) for p1 in range(n) for p2 in range(n) if p1 < p2]
 
     totalgames = (n*n - n)/2 * options.repeats
     playedgames = 0
 
-    totalScores = [[botnames[0], botnames[1], 'winner', 'points', f'{botnames[0]} phase1 score', f'{botnames[1]} phase1 score', 'seed']] # total scores to output to csv
+    header = [botnames[0], botnames[1], 'winner', 'points', f'{botnames[0]} phase1 score', f'{botnames[1]} phase1 score', 'seed'] # header of the csv output
 
-    print('Playing {} games:'.format(int(totalgames)))
+    # Decide the order of the players and the seed of every game before playing any,
+    # so the games do not depend on the number of jobs
+    if options.seed is not None:
+        random.seed(options.seed)
+
+    games = []
     for a, b in matches:
         for r in range(options.repeats):
 
@@ -38,38 +79,97 @@ def run_tournament(options):
 
             # Generate a state with a random seed
             seed = random.randint(0, 100000)
-            state = State.generate(id=seed, phase=int(options.phase))
-
-            (winner, score), (player1score, player2score), (player1phase1score, player2phase1score) = engine.play(bots[p[0]], bots[p[1]], state, options.max_time*1000, verbose=options.verbose, fast=options.fast)
-
-            if winner is not None:
-                winner = p[winner - 1]
-                wins[winner] += score
-                scores = [0, 0, 0, 0, 0, 0, 0, 0, 0] # initial values for total scores
-                scores[p[0]] = player1score
-                scores[p[1]] = player2score
-                scores[2] = botnames[winner]
-                scores[3] = score
-                scores[p[0] + 4] = player1phase1score
-                scores[p[1] + 4] = player2phase1score
-                scores[6] = seed
-                totalScores.append(scores)
+            games.append((p, seed))
+
+    # When resuming, the games of which the seed is already in the output are not played again.
+    # A Counter is used, since the same seed may come up for several games.
+    recorded = Counter()
+    resume = options.resume and os.path.exists(options.output)
+
+    if resume:
+        # The players of the games planned for every seed, to check that the output is of this tournament
+        planned = {}
+        for p, seed in games:
+            planned.setdefault(seed, []).append(p)
 
+        with open(options.output, newline='') as myfile:
+            rows = csv.reader(myfile)
+
+            if next(rows, None) != header:
+                raise ResumeError('{} is the output of a tournament between other players.'.format(options.output))
+
+            for row in rows:
+                seed = int(row[6])
+                recorded[seed] += 1
+
+                players = [botnames[i] for p in planned.get(seed, []) for i in p]
+                if recorded[seed] > len(planned.get(seed, [])) or row[2] not in players:
+                    raise ResumeError('{} contains a game with seed {} won by {}, which is not part of this tournament. '
+                                      'Use the same players, repeats and seed as the interrupted tournament.'.format(options.output, seed, row[2]))
+
+                wins[botnames.index(row[2])] += int(row[3])
+
+    remaining = []
+    for p, seed in games:
+        if recorded[seed] > 0:
+            recorded[seed] -= 1
             playedgames += 1
-            print(f'Player {bots[p[0]]} scored: {player1score}')
-            print(f'Player {bots[p[1]]} scored: {player2score}')
-            print('Played {} out of {:.0f} games ({:.0f}%): {} \r'.format(playedgames, totalgames, playedgames/float(totalgames) * 100, wins))
-            print()
-            
+        else:
+            remaining.append((p, seed))
+    games = remaining
+
+    # Every game is written to the output as soon as it is finished, so that no results are lost
+    # when the tournament is interrupted
+    myfile = open(options.output, 'a' if resume else 'w', newline='')
+    wr = csv.writer(myfile, quoting=csv.QUOTE_ALL)
+
+    if not resume:
+        wr.writerow(header)
+
+    if options.jobs > 1:
+        executor = ProcessPoolExecutor(options.jobs, initializer=load_bots, initargs=(botnames, options.fast))
+        results = executor.map(play_game, games, [options] * len(games))
+    else:
+        executor = None
+        load_bots(botnames, options.fast)
+        results = (play_game(game, options) for game in games)
+
+    print('Playing {} games:'.format(int(totalgames)))
+    for (p, seed), result in zip(games, results):
+
+        (winner, score), (player1score, player2score), (player1phase1score, player2phase1score) = result
+
+        if winner is not None:
+            winner = p[winner - 1]
+            wins[winner] += score
+            scores = [0, 0, 0, 0, 0, 0, 0, 0, 0] # initial values for total scores
+            scores[p[0]] = player1score
+            scores[p[1]] = player2score
+            scores[2] = botnames[winner]
+            scores[3] = score
+            scores[p[0] + 4] = player1phase1score
+            scores[p[1] + 4] = player2phase1score
+            scores[6] = seed
+            wr.writerow(scores)
+            myfile.flush()
+
+        playedgames += 1
+        print(f'Player {botnames[p[0]]} scored: {player1score}')
+        print(f'Player {botnames[p[1]]} scored: {player2score}')
+        print('Played {} out of {:.0f} games ({:.0f}%): {} \r'.format(playedgames, totalgames, playedgames/float(totalgames) * 100, wins))
+        print()
+        
+    if executor is not None:
+        executor.shutdown()
+    elif not options.fast:
+        for bot in bots:
+            bot.stop()
+
     print('Results:')
-    for i in range(len(bots)):
-        print('    bot {}: {} points'.format(bots[i], wins[i]))
+    for i in range(n):
+        print('    bot {}: {} points'.format(botnames[i], wins[i]))
 
-    # output values to csv
-    with open('scores.csv', 'w', newline='') as myfile:
-        wr = csv.writer(myfile, quoting=csv.QUOTE_ALL)
-        for totalScore in totalScores:
-            wr.writerow(totalScore)
+    myfile.close()
 
 if __name__ == "__main__":
 
@@ -96,6 +196,26 @@ if __name__ == "__main__":
                         help="maximum amount of time allowed per turn in seconds (default: 5)",
                         type=int, default=5)
 
+    parser.add_argument("-j", "--jobs",
+                        dest="jobs",
+                        help="How many games to play in parallel, each in its own process (default: 1)",
+                        type=int, default=1)
+
+    parser.add_argument("--seed",
+                        dest="seed",
+                        help="Seed for choosing the games, to make a tournament reproducible",
+                        type=int, default=None)
+
+    parser.add_argument("-o", "--output",
+                        dest="output",
+                        help="The csv file the result of every game is written to (default: scores.csv)",
+                        default="scores.csv")
+
+    parser.add_argument("--resume",
+                        dest="resume",
+                        action="store_true",
+                        help="Continue an interrupted tournament: games already in the output file are not played again. Use the same --seed as the interrupted tournament.")
+
     parser.add_argument("-f", "--fast",
                         dest="fast",
                         action="store_true",
@@ -108,4 +228,11 @@ if __name__ == "__main__":
 
     options = parser.parse_args()
 
-    run_tournament(options)
+    # Without the seed, the games of the interrupted tournament cannot be found in the output
+    if options.resume and options.seed is None:
+        parser.error('--resume requires --seed')
+
+    try:
+        run_tournament(options)
+    except ResumeError as error:
+        parser.error(str(error))
@@ -1,72 +1,123 @@
 """
 Train a machine learning model for the classifier bot. We create a player, and watch it play games against itself.
 Every observed state is converted to a feature vector and labeled with the eventual outcome
-(-1.0: player 2 won, 1.0: player 1 won)
+(-1: player 2 won, 1: player 1 won)
+
+The dataset is stored in the columnar format of bots/ml/dataset.py, which is memory-mapped for training.
 
 This is part of the second worksheet.
 """
 from api import State, util
-import pickle
 import os.path
 from argparse import ArgumentParser
 import time
 import sys
+import random
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 
 # This package contains various machine learning algorithms
 import sklearn
 import sklearn.linear_model
 from sklearn.neural_network import MLPClassifier
 import joblib
+import numpy as np
 
 from bots.rand import rand
 # from bots.rdeep import rdeep
 
-from bots.ml.ml import features
+from bots.ml.ml import feature_matrix
+from bots.ml import dataset, network
 
-def create_dataset(path, player=rand.Bot(), games=2000, phase=1):
+def create_dataset(path, player=rand.Bot(), games=2000, phase=1, jobs=1, seed=None, append=False):
     """Create a dataset that can be used for training the ML bot model.
     The dataset is created by having the player (bot) play games against itself.
     The games parameter indicates how many games will be started.
     
     Each game will be played and the game situations will be stored.
     Then, the game ends and it is recorded whether the game situations resulted in a win or loss for player 1.
-    In other words, each game situation is stored with the corresponding class label (won/lost).
+    In other words, each game situation is stored with the corresponding class label (1/-1).
+
+    Every game gets its own seed, and the games are played in chunks that can be spread over several
+    processes. The chunks are merged in order, so the dataset only depends on the seed, not on the
+    number of processes.
 
     Keyword arguments
     path -- the pathname where the dataset is to be stored
     player -- the player which will play against itself, default the rand Bot
     games -- the number of games to play, default 2000
     phase -- wheter to start the games in phase 1, the default, or phase 2
+    jobs -- the number of processes playing games, default 1
+    seed -- the seed from which the seeds of the games are drawn, default random
+    append -- whether to add the games to an existing dataset at path, instead of replacing it
     """ 
-    
-    data = []
-    target = []
+
+    if not append or not os.path.isfile(os.path.join(path, dataset.META_FILE)):
+        dataset.create(path)
+
+    rng = random.Random(seed)
+    seeds = [rng.randint(0, 2**31) for g in range(games)]
+
+    # The progress bar is updated after every chunk
+    chunk_size = 10
+    chunks = [seeds[i:i + chunk_size] for i in range(0, games, chunk_size)]
+
+    if jobs > 1:
+        executor = ProcessPoolExecutor(jobs)
+        results = executor.map(play_games, chunks, repeat(player), repeat(phase))
+    else:
+        executor = None
+        results = map(play_games, chunks, repeat(player), repeat(phase))
 
     # For progress bar
     bar_length = 30
     start = time.time()
+    played = 0
 
-    for g in range(games-1):
+    # Every chunk is written to disk as soon as it is played, so the dataset is never fully in memory
+    for chunk, (chunk_data, chunk_target) in zip(chunks, results):
+
+        dataset.append(path, chunk_data, chunk_target)
 
         # For progress bar
-        if g % 10 == 0:
-            percent = 100.0*g/games
-            sys.stdout.write('\r')
-            sys.stdout.write("Generating dataset: [{:{}}] {:>3}%".format('='*int(percent/(100.0/bar_length)),bar_length, int(percent)))
-            sys.stdout.flush()
+        played += len(chunk)
+        percent = 100.0*played/games
+        sys.stdout.write('\r')
+        sys.stdout.write("Generating dataset: [{:{}}] {:>3}%".format('='*int(percent/(100.0/bar_length)),bar_length, int(percent)))
+        sys.stdout.flush()
+
+    if executor is not None:
+        executor.shutdown()
+
+    # For printing newline after progress bar
+    print("\nDone. Time to generate dataset: {:.2f} seconds".format(time.time() - start))
+
+    return dataset.load(path)
+
+def play_games(seeds, player, phase):
+    """Play a game for every seed and return the feature matrix of the observed states together with their labels.
+    The global random generator is seeded with the seed of each game, so the games play out the same in every process.
+    """
+
+    states = []
+    target = []
+
+    for seed in seeds:
+
+        random.seed(seed)
 
-        # Randomly generate a state object starting in specified phase.
-        state = State.generate(phase=phase)
+        # Generate a state object starting in specified phase.
+        state = State.generate(id=seed, phase=phase)
 
-        state_vectors = []
+        game_states = []
 
         while not state.finished():
 
             # Give the state a signature if in phase 1, obscuring information that a player shouldn't see.
             given_state = state.clone(signature=state.whose_turn()) if state.get_phase() == 1 else state
 
-            # Add the features representation of a state to the state_vectors array
-            state_vectors.append(features(given_state))
+            # Keep the state, its features are extracted for the whole chunk at once
+            game_states.append(given_state)
 
             # Advance to the next state
             move = player.get_move(given_state)
@@ -74,100 +125,163 @@ def create_dataset(path, player=rand.Bot(), games=2000, phase=1):
 
         winner, score = state.winner()
 
-        for state_vector in state_vectors:
-            data.append(state_vector)
+        states += game_states
+        target += [dataset.WON if winner == 1 else dataset.LOST] * len(game_states)
 
-            if winner == 1:
-                result = 'won'
+    return feature_matrix(states), target
 
-            elif winner == 2:
-                result = 'lost'
+def train_streaming(learner, path, chunk_size=100000, epochs=5, seed=None):
+    """Train a model on a dataset in chunks with partial_fit, so that the dataset never has to be in memory at once.
+    Every epoch visits the chunks in a new random order. The learner needs to support partial_fit, like
+    MLPClassifier and SGDClassifier.
 
-            target.append(result)
+    Keyword arguments
+    learner -- the model to train
+    path -- the directory of the dataset
+    chunk_size -- the number of rows to train on at once, default 100000
+    epochs -- how many times to pass over the whole dataset, default 5
+    seed -- the seed for the order of the chunks, default random
+    """
 
-    with open(path, 'wb') as output:
-        pickle.dump((data, target), output, pickle.HIGHEST_PROTOCOL)
+    data, target = dataset.load(path)
+    classes = np.array([dataset.LOST, dataset.WON], dtype=np.int8)
 
-    # For printing newline after progress bar
-    print("\nDone. Time to generate dataset: {:.2f} seconds".format(time.time() - start))
+    rng = np.random.default_rng(seed)
+    starts = np.arange(0, len(target), chunk_size)
 
-    return data, target
+    for epoch in range(epochs):
 
+        for start in rng.permutation(starts):
+            # Copy only this chunk from the memory map
+            chunk_data = np.asarray(data[start:start + chunk_size])
+            chunk_target = np.asarray(target[start:start + chunk_size])
 
-## Parse the command line options
-parser = ArgumentParser()
+            learner.partial_fit(chunk_data, chunk_target, classes=classes)
 
-parser.add_argument("-d", "--dset-path",
-                    dest="dset_path",
-                    help="Optional dataset path",
-                    default="dataset.pkl")
+        print('Epoch {} of {} done'.format(epoch + 1, epochs))
 
-parser.add_argument("-m", "--model-path",
-                    dest="model_path",
-                    help="Optional model path. Note that this path starts in bots/ml/ instead of the base folder, like dset_path above.",
-                    default="model.pkl")
+    return learner
 
-parser.add_argument("-o", "--overwrite",
-                    dest="overwrite",
-                    action="store_true",
-                    help="Whether to create a new dataset regardless of whether one already exists at the specified path.")
+if __name__ == "__main__":
 
-parser.add_argument("--no-train",
-                    dest="train",
-                    action="store_false",
-                    help="Don't train a model after generating dataset.")
+    ## Parse the command line options
+    parser = ArgumentParser()
 
+    parser.add_argument("-d", "--dset-path",
+                        dest="dset_path",
+                        help="Optional dataset path, a directory",
+                        default="dataset")
 
-options = parser.parse_args()
+    parser.add_argument("-m", "--model-path",
+                        dest="model_path",
+                        help="Optional model path. Note that this path starts in bots/ml/ instead of the base folder, like dset_path above.",
+                        default="model.pkl")
 
-if options.overwrite or not os.path.isfile(options.dset_path):
-    create_dataset(options.dset_path, player=rand.Bot(), games=10000)
+    parser.add_argument("-o", "--overwrite",
+                        dest="overwrite",
+                        action="store_true",
+                        help="Whether to create a new dataset regardless of whether one already exists at the specified path.")
 
-if options.train:
+    parser.add_argument("-j", "--jobs",
+                        dest="jobs",
+                        help="How many processes to generate the dataset with (default: 1)",
+                        type=int, default=1)
 
-    # Play around with the model parameters below
+    parser.add_argument("--seed",
+                        dest="seed",
+                        help="Seed for generating the dataset, to make it reproducible",
+                        type=int, default=None)
 
-    # HINT: Use tournament fast mode (-f flag) to quickly test your different models.
+    parser.add_argument("-a", "--append",
+                        dest="append",
+                        action="store_true",
+                        help="Add newly generated games to the existing dataset instead of replacing it. Implies --overwrite.")
 
-    # The following tuple specifies the number of hidden layers in the neural
-    # network, as well as the number of layers, implicitly through its length.
-    # You can set any number of hidden layers, even just one. Experiment and see what works.
-    hidden_layer_sizes = (64, 32)
+    parser.add_argument("--streaming",
+                        dest="streaming",
+                        action="store_true",
+                        help="Train on the dataset in chunks with partial_fit, for datasets that do not fit in memory.")
 
-    # The learning rate determines how fast we move towards the optimal solution.
-    # A low learning rate will converge slowly, but a large one might overshoot.
-    learning_rate = 0.0001
+    parser.add_argument("--chunk-size",
+                        dest="chunk_size",
+                        help="The number of rows per chunk when training with --streaming (default: 100000)",
+                        type=int, default=100000)
 
-    # The regularization term aims to prevent overfitting, and we can tweak its strength here.
-    regularization_strength = 0.0001
+    parser.add_argument("--epochs",
+                        dest="epochs",
+                        help="The number of passes over the dataset when training with --streaming (default: 5)",
+                        type=int, default=5)
 
-    #############################################
+    parser.add_argument("--no-train",
+                        dest="train",
+                        action="store_false",
+                        help="Don't train a model after generating dataset.")
 
-    start = time.time()
 
-    print("Starting training phase...")
+    options = parser.parse_args()
+
+    if options.overwrite or options.append or not os.path.isfile(os.path.join(options.dset_path, dataset.META_FILE)):
+        create_dataset(options.dset_path, player=rand.Bot(), games=10000, jobs=options.jobs, seed=options.seed, append=options.append)
+
+    if options.train:
+
+        # Play around with the model parameters below
+
+        # HINT: Use tournament fast mode (-f flag) to quickly test your different models.
+
+        # The following tuple specifies the number of hidden layers in the neural
+        # network, as well as the number of layers, implicitly through its length.
+        # You can set any number of hidden layers, even just one. Experiment and see what works.
+        hidden_layer_sizes = (64, 32)
+
+        # The learning rate determines how fast we move towards the optimal solution.
+        # A low learning rate will converge slowly, but a large one might overshoot.
+        learning_rate = 0.0001
+
+        # The regularization term aims to prevent overfitting, and we can tweak its strength here.
+        regularization_strength = 0.0001
+
+        #############################################
+
+        start = time.time()
+
+        print("Starting training phase...")
+
+        data, target = dataset.load(options.dset_path)
+
+        if options.streaming:
+
+            # Train a neural network chunk by chunk. Early stopping is not available with partial_fit.
+            learner = MLPClassifier(hidden_layer_sizes=hidden_layer_sizes, learning_rate_init=learning_rate, alpha=regularization_strength)
+            # learner = sklearn.linear_model.SGDClassifier(loss='log_loss')
+
+            model = train_streaming(learner, options.dset_path, options.chunk_size, options.epochs, options.seed)
+
+        else:
 
-    with open(options.dset_path, 'rb') as output:
-        data, target = pickle.load(output)
+            # Train a neural network
+            learner = MLPClassifier(hidden_layer_sizes=hidden_layer_sizes, learning_rate_init=learning_rate, alpha=regularization_strength, verbose=True, early_stopping=True, n_iter_no_change=6)
+            # learner = sklearn.linear_model.LogisticRegression()
 
-    # Train a neural network
-    learner = MLPClassifier(hidden_layer_sizes=hidden_layer_sizes, learning_rate_init=learning_rate, alpha=regularization_strength, verbose=True, early_stopping=True, n_iter_no_change=6)
-    # learner = sklearn.linear_model.LogisticRegression()
+            model = learner.fit(data, target)
 
-    model = learner.fit(data, target)
+        # Check for class imbalance
+        labels, counts = np.unique(target, return_counts=True)
+        count = {int(label): int(n) for label, n in zip(labels, counts)}
 
-    # Check for class imbalance
-    count = {}
-    for t in target:
-        if t not in count:
-            count[t] = 0
-        count[t] += 1
+        print('instances per class: {}'.format(count))
 
-    print('instances per class: {}'.format(count))
+        # Store the model in the ml directory
+        joblib.dump(model, "./bots/ml/" + options.model_path)
 
-    # Store the model in the ml directory
-    joblib.dump(model, "./bots/ml/" + options.model_path)
+        # Also export the weights of a neural network, so the bot can use it without sklearn.
+        # Other models cannot be exported, so remove an export of an earlier model instead.
+        exported = "./bots/ml/" + os.path.splitext(options.model_path)[0] + ".npz"
+        if isinstance(model, MLPClassifier):
+            network.export(model, exported)
+        elif os.path.isfile(exported):
+            os.remove(exported)
 
-    end = time.time()
+        end = time.time()
 
-    print('Done. Time to train:', (end-start)/60, 'minutes.')
+        print('Done. Time to train:', (end-start)/60, 'minutes.')